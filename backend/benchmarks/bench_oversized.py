@@ -0,0 +1,122 @@
+"""Oversized request flood benchmark for Life Coach App.
+
+Floods `POST /api/analyze` with concurrent oversized bodies streamed in
+chunks without `Content-Length`, calling the ASGI app directly, and reports
+peak traced memory and the status codes returned. With the body limit in
+place the peak stays flat as the flood grows; with `--no-limit` every
+request is buffered whole before it is rejected.
+
+Usage:
+    python benchmarks/bench_oversized.py --requests 10 100 1000
+    python benchmarks/bench_oversized.py --requests 10 100 --no-limit
+"""
+
+import argparse
+import asyncio
+import collections
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from body_limit import BodySizeLimitMiddleware, max_body_size_from_env  # noqa: E402
+from main import app  # noqa: E402
+
+CHUNK = b"a" * (64 * 1024)
+
+
+async def send_oversized(app, body_size: int, statuses: collections.Counter) -> None:
+    """Send one request whose body streams in 64 KiB chunks."""
+    remaining = body_size
+    first = True
+
+    async def receive() -> dict:
+        nonlocal remaining, first
+        await asyncio.sleep(0)
+        if first:
+            first = False
+            return {"type": "http.request", "body": b'{"feeling": "', "more_body": True}
+        if remaining <= 0:
+            return {"type": "http.request", "body": b'"}', "more_body": False}
+        remaining -= len(CHUNK)
+        return {"type": "http.request", "body": CHUNK, "more_body": True}
+
+    async def send(message: dict) -> None:
+        if message["type"] == "http.response.start":
+            statuses[message["status"]] += 1
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/analyze",
+        "raw_path": b"/api/analyze",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"host", b"bench")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+
+
+async def flood(app, requests: int, body_size: int, concurrency: int) -> dict:
+    """Send `requests` oversized requests, `concurrency` at a time."""
+    statuses: collections.Counter = collections.Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            await send_oversized(app, body_size, statuses)
+
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    return {
+        "peak_mib": (peak - baseline) / 2**20,
+        "elapsed_ms": elapsed * 1000,
+        "statuses": dict(statuses),
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    """Run one flood per entry of `--requests` and print the results."""
+    if args.no_limit:
+        # Drop the body limit so the cost of buffering whole bodies is visible
+        app.user_middleware = [
+            m for m in app.user_middleware if m.cls is not BodySizeLimitMiddleware
+        ]
+        app.middleware_stack = None
+
+    # Build the middleware stack before measuring
+    await flood(app, 1, 0, 1)
+    tracemalloc.start()
+    limit = "off" if args.no_limit else f"{max_body_size_from_env()} B"
+    print(f"body={args.body_mib} MiB concurrency={args.concurrency} limit={limit}")
+    for requests in args.requests:
+        result = await flood(app, requests, args.body_mib * 2**20, args.concurrency)
+        print(
+            f"requests={requests:5d} peak={result['peak_mib']:8.2f} MiB "
+            f"time={result['elapsed_ms']:9.1f} ms statuses={result['statuses']}"
+        )
+    tracemalloc.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--body-mib", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--no-limit", action="store_true")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
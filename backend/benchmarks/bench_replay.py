@@ -0,0 +1,143 @@
+"""Replay benchmark for Life Coach App.
+
+Replays recorded (or synthetic) LLM sessions through the full FastAPI stack
+and reports CPU time per request. No network access is needed.
+
+Usage:
+    python benchmarks/bench_replay.py --cassette llm_cassette.jsonl --sessions 2000
+    python benchmarks/bench_replay.py --synthetic --sessions 2000
+
+A session is one `POST /api/analyze` followed by `POST /api/recommend` with
+the returned problems. Cassettes are replayed in recorded order, so record
+them from complete analyze/recommend sessions.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+
+import llm  # noqa: E402
+from cassette import ReplayClient, load_cassette  # noqa: E402
+from main import app  # noqa: E402
+
+
+def synthetic_entries() -> list[dict]:
+    """Build one analyze/recommend session with realistic Czech payload sizes."""
+    problems = [
+        {
+            "id": i,
+            "title": f"Problém číslo {i} s pracovní zátěží",
+            "description": "Uživatel se cítí přetížený prací, málo spí a nemá čas "
+            "na přátele ani na odpočinek. " * 2,
+        }
+        for i in (1, 2, 3)
+    ]
+    recommendations = [
+        {
+            "problem_id": i,
+            "advice": "Naplánuj si každý den krátkou procházku, nastav pevný čas "
+            "na spánek a jednou týdně se ozvi někomu blízkému. " * 2,
+        }
+        for i in (1, 2, 3)
+    ]
+    usage = {"input_tokens": 400, "output_tokens": 350}
+    return [
+        {
+            "key": "synthetic-analyze",
+            "response": {
+                "text": json.dumps({"problems": problems}, ensure_ascii=False),
+                "stop_reason": "end_turn",
+                "usage": usage,
+            },
+            "elapsed": 2.5,
+        },
+        {
+            "key": "synthetic-recommend",
+            "response": {
+                "text": json.dumps({"recommendations": recommendations}, ensure_ascii=False),
+                "stop_reason": "end_turn",
+                "usage": usage,
+            },
+            "elapsed": 3.0,
+        },
+    ]
+
+
+async def run(entries: list[dict], sessions: int, timing: str, keep_store: bool) -> dict:
+    """Replay `sessions` analyze/recommend sessions and collect per-request CPU time."""
+    llm.client = ReplayClient(entries, match="sequence", timing=timing)
+    cpu: dict[str, list[float]] = {"analyze": [], "recommend": []}
+    wall_start = time.perf_counter()
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://bench"
+    ) as client:
+        for _ in range(sessions):
+            if not keep_store:
+                llm.recommendation_store.clear()
+
+            start = time.process_time()
+            response = await client.post(
+                "/api/analyze",
+                json={
+                    "feeling": "Jsem unavený a ve stresu.",
+                    "troubles": "Mám moc práce a málo spím.",
+                    "changes": "Chci mít víc klidu a času na sebe.",
+                },
+            )
+            cpu["analyze"].append(time.process_time() - start)
+            response.raise_for_status()
+
+            start = time.process_time()
+            response = await client.post("/api/recommend", json=response.json())
+            cpu["recommend"].append(time.process_time() - start)
+            response.raise_for_status()
+
+            # Let background store writes finish so the next session sees them
+            await asyncio.gather(*llm._refresh_tasks)
+
+    wall = time.perf_counter() - wall_start
+    return {
+        "sessions": sessions,
+        "wall_seconds": round(wall, 3),
+        "llm_calls": llm.client.calls,
+        **{
+            f"{name}_cpu_ms": {
+                "mean": round(statistics.mean(values) * 1000, 3),
+                "p50": round(statistics.median(values) * 1000, 3),
+                "p99": round(sorted(values)[int(len(values) * 0.99) - 1] * 1000, 3),
+            }
+            for name, values in cpu.items()
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--cassette", help="Cassette file recorded with LLM_CASSETTE_MODE=record")
+    source.add_argument("--synthetic", action="store_true", help="Use a built-in synthetic session")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--timing", choices=["none", "original"], default="none")
+    parser.add_argument(
+        "--keep-store",
+        action="store_true",
+        help="Keep the recommendation store between sessions instead of clearing it",
+    )
+    args = parser.parse_args()
+
+    entries = synthetic_entries() if args.synthetic else load_cassette(args.cassette)
+    result = asyncio.run(run(entries, args.sessions, args.timing, args.keep_store))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Request body limit module for Life Coach App.
+
+This module provides ASGI middleware that enforces a maximum request body
+size while the body is streamed in. Oversized requests are rejected with
+413 before the body is fully buffered, parsed or validated, and therefore
+before any LLM call.
+"""
+
+import json
+import os
+from typing import Any, Callable
+
+from metrics import metrics
+
+# Methods whose bodies are limited
+_BODY_METHODS = frozenset({"POST", "PUT", "PATCH"})
+
+
+class BodySizeLimitMiddleware:
+    """ASGI middleware rejecting request bodies larger than `max_body_size`.
+
+    A `Content-Length` above the limit is rejected without reading the body.
+    Otherwise the received bytes are counted as they arrive; once the limit
+    is exceeded the application sees a client disconnect, anything it tries
+    to send is dropped, and the client gets 413.
+    """
+
+    def __init__(self, app: Any, max_body_size: int = 128 * 1024) -> None:
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or scope["method"] not in _BODY_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0
+                if declared > self.max_body_size:
+                    metrics.increment("body_limit.rejected", reason="content_length")
+                    await self._send_413(send)
+                    return
+                break
+
+        received = 0
+        exceeded = False
+        responded = False
+
+        async def limited_receive() -> dict:
+            nonlocal received, exceeded
+            if exceeded:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    exceeded = True
+                    metrics.increment("body_limit.rejected", reason="streamed")
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message: dict) -> None:
+            nonlocal responded
+            if exceeded:
+                if not responded:
+                    responded = True
+                    await self._send_413(send)
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not exceeded:
+                raise
+        if exceeded and not responded:
+            await self._send_413(send)
+
+    async def _send_413(self, send: Callable) -> None:
+        body = json.dumps({
+            "detail": f"Request body exceeds {self.max_body_size} bytes"
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def max_body_size_from_env() -> int:
+    """Read the request body limit in bytes from `MAX_REQUEST_BODY_BYTES`."""
+    return int(os.getenv("MAX_REQUEST_BODY_BYTES", str(128 * 1024)))
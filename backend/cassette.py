@@ -0,0 +1,191 @@
+"""Cassette module for Life Coach App.
+
+This module records `client.beta.messages.create` calls made by `llm.py`
+into a compact JSON Lines cassette and replays them without network access.
+It is used for regression tests and for benchmarks with realistic responses.
+
+Set `LLM_CASSETTE_MODE` to `record` or `replay` and `LLM_CASSETTE_PATH` to
+the cassette file to enable it for the running app.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Any
+
+
+class CassetteMissError(LookupError):
+    """Raised when a replayed request has no recorded response."""
+
+
+def request_key(kwargs: dict[str, Any]) -> str:
+    """Return a stable hash of the request arguments."""
+    canonical = json.dumps(kwargs, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def call_kind(kwargs: dict[str, Any]) -> str:
+    """Return the kind of a structured call: the top-level key of its output schema."""
+    schema = (kwargs.get("output_format") or {}).get("schema") or {}
+    keys = schema.get("required") or sorted(schema.get("properties") or {})
+    return keys[0] if keys else ""
+
+
+def entry_kind(entry: dict[str, Any]) -> str:
+    """Return the call kind of a cassette entry.
+
+    Uses the recorded request, or the top-level key of the response JSON for
+    entries recorded without one.
+    """
+    if "request" in entry:
+        return call_kind(entry["request"])
+    try:
+        result = json.loads(entry["response"]["text"])
+    except (ValueError, TypeError):
+        return ""
+    return next(iter(result), "") if isinstance(result, dict) else ""
+
+
+def _serialize_response(response: Any) -> dict[str, Any]:
+    usage = getattr(response, "usage", None)
+    return {
+        "text": response.content[0].text,
+        "stop_reason": getattr(response, "stop_reason", None),
+        "usage": {
+            "input_tokens": getattr(usage, "input_tokens", None),
+            "output_tokens": getattr(usage, "output_tokens", None),
+        },
+    }
+
+
+def build_response(data: dict[str, Any]) -> SimpleNamespace:
+    """Build an object shaped like an Anthropic message from cassette data."""
+    return SimpleNamespace(
+        content=[SimpleNamespace(type="text", text=data["text"])],
+        stop_reason=data.get("stop_reason"),
+        usage=SimpleNamespace(**data.get("usage", {})),
+    )
+
+
+def load_cassette(path: str) -> list[dict[str, Any]]:
+    """Read all entries from a cassette file."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_entry(path: str, entry: dict[str, Any]) -> None:
+    """Append one entry to a cassette file."""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+class RecordingClient:
+    """Client wrapper that records every `beta.messages.create` exchange.
+
+    Exposes the same `beta.messages.create` coroutine as `AsyncAnthropic`.
+    Entries are appended from a worker thread, one at a time, so recording
+    does no file I/O on the event loop.
+    """
+
+    def __init__(self, client: Any, path: str) -> None:
+        self._client = client
+        self.path = path
+        self._write_lock = asyncio.Lock()
+        self.beta = SimpleNamespace(messages=SimpleNamespace(create=self._create))
+
+    async def _create(self, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        response = await self._client.beta.messages.create(**kwargs)
+        elapsed = time.perf_counter() - start
+        entry = {
+            "key": request_key(kwargs),
+            "request": kwargs,
+            "response": _serialize_response(response),
+            "elapsed": round(elapsed, 4),
+        }
+        async with self._write_lock:
+            await asyncio.to_thread(write_entry, self.path, entry)
+        return response
+
+
+class ReplayClient:
+    """Client that serves recorded responses instead of calling the API.
+
+    Args:
+        entries: Cassette entries, as returned by `load_cassette`.
+        match: `request` serves the response recorded for identical request
+            arguments; `sequence` serves entries of the same call kind (see
+            `call_kind`) in recorded order, cycling, so calls skipped by
+            the app, e.g. on store hits, do not shift other kinds.
+        timing: `original` sleeps for the recorded upstream time, `none`
+            returns immediately.
+    """
+
+    def __init__(
+        self,
+        entries: list[dict[str, Any]],
+        match: str = "request",
+        timing: str = "none",
+    ) -> None:
+        if match not in ("request", "sequence"):
+            raise ValueError(f"Unknown cassette match mode: {match}")
+        if timing not in ("original", "none"):
+            raise ValueError(f"Unknown cassette timing mode: {timing}")
+        self.entries = entries
+        self.match = match
+        self.timing = timing
+        self.calls = 0
+        self._by_key: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        self._by_kind: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        for entry in entries:
+            self._by_key[entry["key"]].append(entry)
+            self._by_kind[entry_kind(entry)].append(entry)
+        self._served: dict[str, int] = defaultdict(int)
+        self.beta = SimpleNamespace(messages=SimpleNamespace(create=self._create))
+
+    def _next_entry(self, kwargs: dict[str, Any]) -> dict[str, Any]:
+        if self.match == "sequence":
+            key = call_kind(kwargs)
+            candidates = self._by_kind.get(key)
+            if not candidates:
+                raise CassetteMissError(f"No recorded response for call kind {key!r}")
+        else:
+            key = request_key(kwargs)
+            candidates = self._by_key.get(key)
+            if not candidates:
+                raise CassetteMissError(f"No recorded response for request {key[:12]}")
+        index = self._served[key] % len(candidates)
+        self._served[key] += 1
+        return candidates[index]
+
+    async def _create(self, **kwargs: Any) -> SimpleNamespace:
+        entry = self._next_entry(kwargs)
+        self.calls += 1
+        if self.timing == "original":
+            await asyncio.sleep(entry.get("elapsed", 0))
+        return build_response(entry["response"])
+
+
+def client_from_env(client: Any) -> Any:
+    """Wrap `client` according to `LLM_CASSETTE_MODE` and `LLM_CASSETTE_PATH`.
+
+    Returns:
+        The original client when no cassette mode is configured.
+    """
+    mode = os.getenv("LLM_CASSETTE_MODE")
+    if not mode:
+        return client
+    path = os.getenv("LLM_CASSETTE_PATH", "llm_cassette.jsonl")
+    if mode == "record":
+        return RecordingClient(client, path)
+    if mode == "replay":
+        return ReplayClient(
+            load_cassette(path),
+            match=os.getenv("LLM_CASSETTE_MATCH", "request"),
+            timing=os.getenv("LLM_CASSETTE_TIMING", "none"),
+        )
+    raise ValueError(f"Unknown LLM_CASSETTE_MODE: {mode}")
@@ -0,0 +1,145 @@
+"""Compression module for Life Coach App.
+
+This module provides ASGI middleware that compresses JSON responses above a
+size threshold with brotli (if the optional `brotli` package is installed)
+or gzip, depending on the client's `Accept-Encoding`.
+"""
+
+import gzip
+import os
+from typing import Any, Callable
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """Parse an `Accept-Encoding` header into a mapping of coding to q-value."""
+    codings = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding.strip().lower()] = q
+    return codings
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing complete JSON responses.
+
+    Responses are compressed only when they are sent in a single body
+    message, are at least `minimum_size` bytes, have a compressible media
+    type and are not already encoded.
+
+    Args:
+        app: The ASGI application.
+        minimum_size: Smallest body in bytes worth compressing.
+        gzip_level: gzip compression level (1-9).
+        brotli_quality: brotli quality (0-11).
+        media_types: Content types eligible for compression.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        media_types: tuple[str, ...] = ("application/json",),
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.media_types = media_types
+
+    def choose_encoding(self, accept_encoding: str) -> str | None:
+        """Pick the best supported encoding accepted by the client."""
+        accepted = parse_accept_encoding(accept_encoding)
+        if brotli is not None and accepted.get("br", 0) > 0:
+            return "br"
+        if accepted.get("gzip", 0) > 0:
+            return "gzip"
+        return None
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        """Compress a body with the given encoding."""
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = self.choose_encoding(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: dict | None = None
+
+        async def send_compressed(message: dict) -> None:
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            if message.get("more_body", False) or not self._should_compress(start, body):
+                await send(start)
+                await send(message)
+                return
+
+            compressed = self.compress(body, encoding)
+            headers = [
+                (k, v) for k, v in start.get("headers", [])
+                if k not in (b"content-length", b"vary")
+            ]
+            vary = [v for k, v in start.get("headers", []) if k == b"vary"]
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", b", ".join([*vary, b"Accept-Encoding"])),
+            ]
+            await send({**start, "headers": headers})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _should_compress(self, start: dict, body: bytes) -> bool:
+        if len(body) < self.minimum_size:
+            return False
+        headers = dict(start.get("headers", []))
+        if b"content-encoding" in headers:
+            return False
+        content_type = headers.get(b"content-type", b"").decode("latin-1")
+        return content_type.split(";")[0].strip() in self.media_types
+
+
+def compression_settings_from_env() -> dict[str, int]:
+    """Read compression settings from the environment."""
+    return {
+        "minimum_size": int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024")),
+        "gzip_level": int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+        "brotli_quality": int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4")),
+    }
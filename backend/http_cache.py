@@ -0,0 +1,104 @@
+"""HTTP cache module for Life Coach App.
+
+This module keeps recommendation results addressable by a hash of their
+input, and provides deterministic ETags and `If-None-Match` matching so
+clients can revalidate results without downloading them again.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from shared_state import SharedStore
+
+
+def canonical_json(value: Any) -> bytes:
+    """Serialize a value to canonical JSON bytes (sorted keys, no whitespace)."""
+    return json.dumps(
+        value, sort_keys=True, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+def result_id(request_payload: Any) -> str:
+    """Return the stable id of a result, derived from its request payload."""
+    return hashlib.sha256(canonical_json(request_payload)).hexdigest()[:32]
+
+
+def compute_etag(payload: Any) -> str:
+    """Return a deterministic weak ETag for a JSON payload.
+
+    The ETag is weak because the same payload may be sent with different
+    content encodings.
+    """
+    return f'W/"{hashlib.sha256(canonical_json(payload)).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Check an `If-None-Match` header against an ETag using weak comparison."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+class ResultCache:
+    """Cache of response payloads addressed by result id.
+
+    Uses a bounded in-memory LRU, or `shared` when given so every worker
+    process can serve results computed by any other. Entries expire `ttl`
+    seconds after they were stored.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        ttl: float = 24 * 60 * 60,
+        shared: SharedStore | None = None,
+        prefix: str = "result",
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared = shared
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, dict[str, Any]] = OrderedDict()
+
+    @property
+    def does_io(self) -> bool:
+        """Whether methods do blocking I/O and should run off the event loop."""
+        return self.shared is not None
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """Return `{"payload", "etag"}` for a result id, or None."""
+        if self.shared is not None:
+            return self.shared.get(f"{self.prefix}:{key}")
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires_at"] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return {"payload": entry["payload"], "etag": entry["etag"]}
+
+    def put(self, key: str, payload: Any) -> str:
+        """Store a payload under a result id and return its ETag."""
+        entry = {"payload": payload, "etag": compute_etag(payload)}
+        if self.shared is not None:
+            self.shared.set(f"{self.prefix}:{key}", entry, ttl=self.ttl)
+            return entry["etag"]
+        with self._lock:
+            self._entries[key] = {**entry, "expires_at": time.time() + self.ttl}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry["etag"]
@@ -4,6 +4,7 @@ This module provides functions to interact with Claude AI for analyzing
 user problems and generating recommendations using structured outputs.
 """
 
+import asyncio
 import json
 import logging
 import os
@@ -12,25 +13,244 @@ from typing import Any
 from anthropic import AsyncAnthropic
 from dotenv import load_dotenv
 
+from cassette import client_from_env
+from metrics import metrics
+from recommendation_store import RecommendationStore, SharedRecommendationStore
+from scheduler import BACKGROUND, INTERACTIVE, LLMScheduler
+from shared_state import call_store, shared_store_from_env
+from token_budget import (
+    ANALYZE_FIELD_TOKEN_BUDGET,
+    MAX_OUTPUT_TOKENS,
+    PROBLEM_FIELD_TOKEN_BUDGET,
+    compact_fields,
+    max_output_tokens,
+)
+from tracing import SPAN_KIND_CLIENT, traced, tracer
+
 logger = logging.getLogger(__name__)
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Initialize the Anthropic client
-client = AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+# Initialize the Anthropic client, optionally recording or replaying a cassette
+client = client_from_env(AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY")))
 
 # Model to use - Sonnet 4.5 supports structured outputs
 MODEL = "claude-sonnet-4-5"
 
+# Expected output sizes, matching the limits given in the system prompts
+PROBLEM_COUNT = 3
+PROBLEM_MAX_CHARS = 50 + 200
+RECOMMENDATION_MAX_CHARS = 300
+
+# State shared by all worker processes on this host, if SHARED_STATE_PATH is set
+shared_store = shared_store_from_env()
+
+# Store of previously generated advice, keyed by normalized problem
+recommendation_store: RecommendationStore
+if shared_store is not None:
+    recommendation_store = SharedRecommendationStore(
+        shared_store,
+        refresh_after=float(os.getenv("RECOMMENDATION_REFRESH_SECONDS", "86400")),
+    )
+else:
+    recommendation_store = RecommendationStore(
+        max_entries=int(os.getenv("RECOMMENDATION_STORE_SIZE", "1000")),
+        refresh_after=float(os.getenv("RECOMMENDATION_REFRESH_SECONDS", "86400")),
+    )
+
+# Background refresh tasks, referenced so they are not garbage collected
+_refresh_tasks: set[asyncio.Task] = set()
+
+# Priority scheduler shared by all API calls from this process
+scheduler = LLMScheduler(max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")))
+
+# Follow-up calls allowed to repair an invalid response before regenerating it
+MAX_REPAIR_ATTEMPTS = int(os.getenv("LLM_MAX_REPAIR_ATTEMPTS", "2"))
+
+ANALYZE_SYSTEM_PROMPT = """Jsi empatický asistent životního kouče. Tvým úkolem je analyzovat
+pocity uživatele, jeho problémy a požadované změny a identifikovat 3 hlavní životní problémy.
+
+Identifikuj přesně 3 problémy na základě toho, co uživatel sdílí. Každý problém by měl mít:
+- id: číslo (1, 2 nebo 3)
+- title: krátký, jasný název (max 50 znaků) - ČESKY
+- description: podrobný, ale stručný popis problému (max 200 znaků) - ČESKY
+
+Buď empatický a vnímavý ve své analýze. VŽDY odpovídej v češtině."""
+
+RECOMMEND_SYSTEM_PROMPT = """Jsi empatický a praktický životní kouč. Tvým úkolem je poskytnout
+konkrétní doporučení pro každý životní problém, který uživatel potvrdil.
+
+Pro každý problém poskytni konkrétní, realizovatelnou radu, která je:
+- Praktická a dosažitelná
+- Specifická, ne obecná
+- Povzbuzující a podpůrná
+- Zaměřená na konkrétní kroky, které uživatel může podniknout
+
+Každé doporučení by mělo mít max 300 znaků. VŽDY odpovídej v češtině."""
+
+PROBLEMS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "problems": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer"},
+                    "title": {"type": "string"},
+                    "description": {"type": "string"}
+                },
+                "required": ["id", "title", "description"],
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["problems"],
+    "additionalProperties": False
+}
+
+RECOMMENDATIONS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "recommendations": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "problem_id": {"type": "integer"},
+                    "advice": {"type": "string"}
+                },
+                "required": ["problem_id", "advice"],
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["recommendations"],
+    "additionalProperties": False
+}
+
+# Used to repair an analysis with too many problems by choosing which to keep
+KEEP_IDS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "keep_ids": {"type": "array", "items": {"type": "integer"}}
+    },
+    "required": ["keep_ids"],
+    "additionalProperties": False
+}
+
+
+async def _create_message(priority: str, **kwargs: Any) -> Any:
+    """Call the Messages API once a scheduler slot for `priority` is free."""
+    queue_span = tracer.start_span("llm.queue", **{"llm.priority": priority})
+    try:
+        async with scheduler.slot(priority):
+            queue_span.end()
+            with tracer.span(
+                "llm.messages.create",
+                kind=SPAN_KIND_CLIENT,
+                **{
+                    "gen_ai.system": "anthropic",
+                    "gen_ai.request.model": kwargs.get("model"),
+                    "gen_ai.request.max_tokens": kwargs.get("max_tokens"),
+                },
+            ) as span:
+                response = await client.beta.messages.create(**kwargs)
+                if span.recording:
+                    usage = getattr(response, "usage", None)
+                    for name in ("input_tokens", "output_tokens"):
+                        span.set_attribute(f"gen_ai.usage.{name}", getattr(usage, name, None))
+                    span.set_attribute("gen_ai.response.finish_reasons", response.stop_reason)
+                return response
+    finally:
+        queue_span.end()
+
+
+async def _call_structured(
+    priority: str,
+    system: str,
+    messages: list[dict[str, str]],
+    schema: dict[str, Any],
+    max_tokens: int,
+    key: str,
+) -> tuple[Any, Any]:
+    """Call Claude AI with a JSON schema and return the response and `result[key]`.
+
+    A response cut off by `max_tokens` is retried once with
+    `MAX_OUTPUT_TOKENS`, since the budget is only an estimate of the
+    output length.
+
+    Raises:
+        ValueError: If the response is not valid JSON.
+        anthropic.APIError: If the API call fails.
+    """
+
+    async def create(max_tokens: int) -> Any:
+        # Use beta API with structured outputs
+        response = await _create_message(
+            priority,
+            model=MODEL,
+            max_tokens=max_tokens,
+            betas=["structured-outputs-2025-11-13"],
+            system=system,
+            messages=messages,
+            output_format={"type": "json_schema", "schema": schema},
+        )
+        logger.info(f"Response stop_reason: {response.stop_reason}")
+        return response
+
+    response = await create(max_tokens)
+    if response.stop_reason == "max_tokens" and max_tokens < MAX_OUTPUT_TOKENS:
+        metrics.increment("token_budget.truncated", key=key)
+        logger.warning(f"Response truncated at max_tokens={max_tokens}, retrying")
+        response = await create(MAX_OUTPUT_TOKENS)
 
-async def analyze_problems(feeling: str, troubles: str, changes: str) -> list[dict[str, Any]]:
+    # Parse the structured response
+    with tracer.span("llm.parse") as span:
+        response_text = response.content[0].text
+        logger.info(f"Structured response: {response_text[:500]}")
+
+        result = json.loads(response_text)
+        span.set_attribute("llm.response.items", len(result[key]))
+    return response, result[key]
+
+
+def _output_tokens(response: Any) -> int | None:
+    """Return the output tokens reported for a response, if available."""
+    output_tokens = getattr(getattr(response, "usage", None), "output_tokens", None)
+    return output_tokens if isinstance(output_tokens, int) else None
+
+
+def _record_repair(endpoint: str, full_response: Any, repair_response: Any) -> None:
+    """Count a repair call and the output tokens it saved over a full regeneration.
+
+    Output tokens are compared because they dominate latency and cost; the
+    repair prompt is slightly longer than the original one.
+    """
+    metrics.increment("llm.repair.attempts", endpoint=endpoint)
+    full = _output_tokens(full_response)
+    repair = _output_tokens(repair_response)
+    if full is not None and repair is not None:
+        metrics.increment("llm.repair.tokens_saved", max(full - repair, 0), endpoint=endpoint)
+
+
+@traced("llm.analyze_problems")
+async def analyze_problems(
+    feeling: str, troubles: str, changes: str, priority: str = INTERACTIVE
+) -> list[dict[str, Any]]:
     """Analyze user input and identify 3 main life problems.
 
+    If the response has the wrong number of problems, up to
+    `MAX_REPAIR_ATTEMPTS` small follow-up calls ask only for the missing
+    problems or for which problems to keep, before the analysis is
+    regenerated once from scratch.
+
     Args:
         feeling: How the user is currently feeling.
         troubles: What troubles or challenges the user is facing.
         changes: What changes the user wants to make in their life.
+        priority: Scheduler class: "interactive", "background" or "batch".
 
     Returns:
         A list of exactly 3 problems, each containing:
@@ -42,156 +262,357 @@ async def analyze_problems(feeling: str, troubles: str, changes: str) -> list[di
         ValueError: If the API response is invalid.
         anthropic.APIError: If the API call fails.
     """
-    system_prompt = """Jsi empatický asistent životního kouče. Tvým úkolem je analyzovat
-pocity uživatele, jeho problémy a požadované změny a identifikovat 3 hlavní životní problémy.
-
-Identifikuj přesně 3 problémy na základě toho, co uživatel sdílí. Každý problém by měl mít:
-- id: číslo (1, 2 nebo 3)
-- title: krátký, jasný název (max 50 znaků) - ČESKY
-- description: podrobný, ale stručný popis problému (max 200 znaků) - ČESKY
-
-Buď empatický a vnímavý ve své analýze. VŽDY odpovídej v češtině."""
+    # Compact over-long input so a single huge paste cannot blow up latency and cost
+    fields = compact_fields(
+        {"feeling": feeling, "troubles": troubles, "changes": changes},
+        max_tokens=ANALYZE_FIELD_TOKEN_BUDGET,
+        endpoint="analyze",
+    )
 
     user_message = f"""Prosím analyzuj mou situaci a identifikuj mé 3 hlavní životní problémy:
 
-Jak se cítím: {feeling}
+Jak se cítím: {fields["feeling"]}
 
-Co mě trápí: {troubles}
+Co mě trápí: {fields["troubles"]}
 
-Co chci změnit: {changes}"""
+Co chci změnit: {fields["changes"]}"""
+    messages = [{"role": "user", "content": user_message}]
+    max_tokens = max_output_tokens(PROBLEM_COUNT, PROBLEM_MAX_CHARS, endpoint="analyze")
 
     logger.info("Calling Claude API with structured output for problem analysis")
-
-    # Use beta API with structured outputs
-    response = await client.beta.messages.create(
-        model=MODEL,
-        max_tokens=1024,
-        betas=["structured-outputs-2025-11-13"],
-        system=system_prompt,
-        messages=[
-            {"role": "user", "content": user_message}
-        ],
-        output_format={
-            "type": "json_schema",
-            "schema": {
-                "type": "object",
-                "properties": {
-                    "problems": {
-                        "type": "array",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "id": {"type": "integer"},
-                                "title": {"type": "string"},
-                                "description": {"type": "string"}
-                            },
-                            "required": ["id", "title", "description"],
-                            "additionalProperties": False
-                        }
-                    }
-                },
-                "required": ["problems"],
-                "additionalProperties": False
-            }
-        }
+    response, problems = await _call_structured(
+        priority, ANALYZE_SYSTEM_PROMPT, messages, PROBLEMS_SCHEMA, max_tokens, "problems"
     )
 
-    logger.info(f"Response stop_reason: {response.stop_reason}")
-
-    # Parse the structured response
-    response_text = response.content[0].text
-    logger.info(f"Structured response: {response_text[:500]}")
+    if len(problems) != PROBLEM_COUNT:
+        problems = await _repair_problems(problems, messages, response, priority)
 
-    result = json.loads(response_text)
-    problems = result["problems"]
+    if len(problems) != PROBLEM_COUNT:
+        logger.info("Repair failed, regenerating problem analysis")
+        metrics.increment("llm.repair.regenerations", endpoint="analyze")
+        _, problems = await _call_structured(
+            priority, ANALYZE_SYSTEM_PROMPT, messages, PROBLEMS_SCHEMA, max_tokens, "problems"
+        )
 
     # Validate we got exactly 3 problems
-    if len(problems) != 3:
+    if len(problems) != PROBLEM_COUNT:
         raise ValueError(f"Expected exactly 3 problems, got {len(problems)}")
 
     return problems
 
 
-async def get_recommendations(problems: list[dict[str, Any]]) -> list[dict[str, Any]]:
+async def _repair_problems(
+    problems: list[dict[str, Any]],
+    messages: list[dict[str, str]],
+    full_response: Any,
+    priority: str,
+) -> list[dict[str, Any]]:
+    """Fix the number of problems with small follow-up calls.
+
+    Sends the previous output back with a short correction and asks only
+    for the missing problems, or only for the ids of the problems to keep.
+
+    Returns:
+        The repaired problems renumbered from 1, or the last attempt if the
+        count is still wrong after `MAX_REPAIR_ATTEMPTS` calls.
+    """
+    for _ in range(MAX_REPAIR_ATTEMPTS):
+        if len(problems) == PROBLEM_COUNT:
+            break
+        previous = json.dumps({"problems": problems}, ensure_ascii=False)
+        repair_messages = [*messages, {"role": "assistant", "content": previous}]
+
+        if len(problems) < PROBLEM_COUNT:
+            count = PROBLEM_COUNT - len(problems)
+            logger.info(f"Repairing analysis: asking for {count} missing problems")
+            repair_messages.append({
+                "role": "user",
+                "content": f"Vrátil jsi {len(problems)} problémů místo {PROBLEM_COUNT}. "
+                f"Vrať POUZE {count} další problémy, které se neopakují s předchozími.",
+            })
+            response, extra = await _call_structured(
+                priority,
+                ANALYZE_SYSTEM_PROMPT,
+                repair_messages,
+                PROBLEMS_SCHEMA,
+                max_output_tokens(count, PROBLEM_MAX_CHARS, endpoint="analyze_repair"),
+                "problems",
+            )
+            problems = [*problems, *extra]
+        else:
+            logger.info(f"Repairing analysis: choosing {PROBLEM_COUNT} of {len(problems)} problems")
+            repair_messages.append({
+                "role": "user",
+                "content": f"Vrátil jsi {len(problems)} problémů místo {PROBLEM_COUNT}. "
+                f"Vrať POUZE id {PROBLEM_COUNT} nejdůležitějších problémů.",
+            })
+            response, keep_ids = await _call_structured(
+                priority,
+                ANALYZE_SYSTEM_PROMPT,
+                repair_messages,
+                KEEP_IDS_SCHEMA,
+                max_output_tokens(PROBLEM_COUNT, 4, endpoint="analyze_repair"),
+                "keep_ids",
+            )
+            by_id = {p["id"]: p for p in problems}
+            problems = [by_id[i] for i in dict.fromkeys(keep_ids) if i in by_id]
+
+        _record_repair("analyze", full_response, response)
+        problems = [{**p, "id": i} for i, p in enumerate(problems, start=1)]
+
+    return problems
+
+
+@traced("llm.get_recommendations")
+async def get_recommendations(
+    problems: list[dict[str, Any]], priority: str = INTERACTIVE
+) -> list[dict[str, Any]]:
     """Generate actionable recommendations for each confirmed problem.
 
+    Problems already present in the recommendation store are answered from
+    the store; Claude AI is only called for the missing ones. Stale store
+    entries are served immediately and refreshed in the background. If the
+    response misses some problems, up to `MAX_REPAIR_ATTEMPTS` follow-up
+    calls ask only for those, before they are regenerated once from scratch.
+
     Args:
         problems: A list of problem dictionaries, each containing:
             - id (int): Unique identifier for the problem
             - title (str): Short title describing the problem
             - description (str): Detailed description of the problem
+        priority: Scheduler class: "interactive", "background" or "batch".
 
     Returns:
-        A list of recommendations, each containing:
+        A list of recommendations in the order of `problems`, each containing:
         - problem_id (int): The ID of the problem this recommendation addresses
         - advice (str): Actionable advice for addressing the problem
 
     Raises:
-        ValueError: If the API response is invalid.
+        ValueError: If the API response is invalid or misses a problem.
         anthropic.APIError: If the API call fails.
     """
-    system_prompt = """Jsi empatický a praktický životní kouč. Tvým úkolem je poskytnout
-konkrétní doporučení pro každý životní problém, který uživatel potvrdil.
+    advice_by_id: dict[int, str] = {}
+    missing: list[dict[str, Any]] = []
+    stale: list[dict[str, Any]] = []
 
-Pro každý problém poskytni konkrétní, realizovatelnou radu, která je:
-- Praktická a dosažitelná
-- Specifická, ne obecná
-- Povzbuzující a podpůrná
-- Zaměřená na konkrétní kroky, které uživatel může podniknout
-
-Každé doporučení by mělo mít max 300 znaků. VŽDY odpovídej v češtině."""
+    stored = await _call_recommendation_store(
+        "lookup_many", problems, default=[(None, False)] * len(problems)
+    )
+    for problem, (advice, is_stale) in zip(problems, stored):
+        if advice is None:
+            metrics.increment("recommendation_store.misses")
+            missing.append(problem)
+            continue
+        metrics.increment("recommendation_store.hits")
+        advice_by_id[problem["id"]] = advice
+        if is_stale:
+            stale.append(problem)
+
+    logger.info(
+        f"Recommendation store: {len(advice_by_id)} hits, {len(missing)} misses"
+    )
 
-    # Format the problems for the prompt
-    problems_text = "\n".join([
-        f"Problém {p['id']}: {p['title']}\nPopis: {p['description']}"
+    if missing:
+        logger.info("Calling Claude API with structured output for recommendations")
+        messages = _recommendation_messages(missing)
+        response, generated = await _call_structured(
+            priority,
+            RECOMMEND_SYSTEM_PROMPT,
+            messages,
+            RECOMMENDATIONS_SCHEMA,
+            max_output_tokens(len(missing), RECOMMENDATION_MAX_CHARS, endpoint="recommend"),
+            "recommendations",
+        )
+        await _collect_recommendations(missing, generated, advice_by_id)
+        await _repair_recommendations(
+            missing, messages, response, generated, advice_by_id, priority
+        )
+
+        unanswered = [p for p in missing if p["id"] not in advice_by_id]
+        if unanswered:
+            logger.info(f"Repair failed, regenerating {len(unanswered)} recommendations")
+            metrics.increment("llm.repair.regenerations", endpoint="recommend")
+            generated = await _generate_recommendations(unanswered, priority)
+            await _collect_recommendations(unanswered, generated, advice_by_id)
+
+        unanswered_ids = [p["id"] for p in missing if p["id"] not in advice_by_id]
+        if unanswered_ids:
+            raise ValueError(f"Missing recommendations for problems {unanswered_ids}")
+
+        if len(missing) > 1:
+            # Advice written next to other client-supplied problems is not stored
+            stale.extend(missing)
+
+    if stale:
+        _schedule_refresh(stale)
+
+    return [
+        {"problem_id": p["id"], "advice": advice_by_id[p["id"]]}
         for p in problems
-    ])
+        if p["id"] in advice_by_id
+    ]
+
+
+async def _collect_recommendations(
+    problems: list[dict[str, Any]],
+    generated: list[dict[str, Any]],
+    advice_by_id: dict[int, str],
+) -> None:
+    """Collect generated advice for `problems`, ignoring unknown problem ids.
+
+    Advice is stored only when `problems`, the problems in the prompt, is a
+    single problem. Advice generated next to other client-supplied problems
+    could be steered by them (prompt injection), and stored advice is
+    served to every user with the same problem.
+    """
+    by_id = {p["id"]: p for p in problems}
+    items = []
+    for rec in generated:
+        problem = by_id.get(rec["problem_id"])
+        if problem is None:
+            metrics.increment("llm.repair.dropped_items", endpoint="recommend")
+            continue
+        items.append((problem, rec["advice"]))
+        advice_by_id[rec["problem_id"]] = rec["advice"]
+    if len(problems) == 1 and items:
+        await _call_recommendation_store("put_many", items)
+
+
+async def _repair_recommendations(
+    problems: list[dict[str, Any]],
+    messages: list[dict[str, str]],
+    full_response: Any,
+    generated: list[dict[str, Any]],
+    advice_by_id: dict[int, str],
+    priority: str,
+) -> None:
+    """Ask only for the recommendations missing from a response.
+
+    Sends the previous output back with a short correction, at most
+    `MAX_REPAIR_ATTEMPTS` times, and stores whatever it returns.
+    """
+    generated = list(generated)
+    for _ in range(MAX_REPAIR_ATTEMPTS):
+        missing_ids = [p["id"] for p in problems if p["id"] not in advice_by_id]
+        if not missing_ids:
+            return
+        logger.info(f"Repairing recommendations: asking for problems {missing_ids}")
+        previous = json.dumps({"recommendations": generated}, ensure_ascii=False)
+        repair_messages = [
+            *messages,
+            {"role": "assistant", "content": previous},
+            {
+                "role": "user",
+                "content": "Chybí doporučení pro problémy s id "
+                f"{', '.join(str(i) for i in missing_ids)}. "
+                "Vrať POUZE doporučení pro tyto problémy.",
+            },
+        ]
+        response, extra = await _call_structured(
+            priority,
+            RECOMMEND_SYSTEM_PROMPT,
+            repair_messages,
+            RECOMMENDATIONS_SCHEMA,
+            max_output_tokens(
+                len(missing_ids), RECOMMENDATION_MAX_CHARS, endpoint="recommend_repair"
+            ),
+            "recommendations",
+        )
+        _record_repair("recommend", full_response, response)
+        await _collect_recommendations(problems, extra, advice_by_id)
+        generated.extend(extra)
+
+
+async def _call_recommendation_store(method: str, *args: Any, default: Any = None) -> Any:
+    """Call a recommendation store method, returning `default` if it fails.
+
+    The store only saves API calls, so a failing lookup counts as a miss and
+    a failing write is skipped instead of failing the request.
+    """
+    try:
+        return await call_store(recommendation_store, method, *args)
+    except Exception as e:
+        logger.warning(f"Recommendation store {method} failed: {e}")
+        metrics.increment("recommendation_store.errors", op=method)
+        return default
+
+
+def _schedule_refresh(problems: list[dict[str, Any]]) -> None:
+    """Generate store entries in a background task, one problem per API call.
+
+    Used for stale entries and for advice that was answered in a batch and
+    therefore not stored.
+    """
+
+    async def refresh_one(problem: dict[str, Any]) -> None:
+        if not await _call_recommendation_store("begin_refresh", problem, default=False):
+            return
+        try:
+            generated = await _generate_recommendations([problem], BACKGROUND)
+            await _call_recommendation_store("put_many", [
+                (problem, rec["advice"])
+                for rec in generated
+                if rec["problem_id"] == problem["id"]
+            ])
+            metrics.increment("recommendation_store.refreshes")
+        except Exception as e:
+            logger.warning(f"Background recommendation refresh failed: {e}")
+            metrics.increment("recommendation_store.refresh_errors")
+        finally:
+            await _call_recommendation_store("end_refresh", problem)
+
+    async def refresh() -> None:
+        await asyncio.gather(*(refresh_one(p) for p in problems))
+
+    task = asyncio.create_task(refresh())
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+
+def _recommendation_messages(problems: list[dict[str, Any]]) -> list[dict[str, str]]:
+    """Build the user message asking for recommendations for `problems`."""
+    # Format the problems for the prompt, compacting over-long client-supplied text
+    problem_lines = []
+    for p in problems:
+        fields = compact_fields(
+            {"title": p["title"], "description": p["description"]},
+            max_tokens=PROBLEM_FIELD_TOKEN_BUDGET,
+            endpoint="recommend",
+        )
+        problem_lines.append(
+            f"Problém {p['id']}: {fields['title']}\nPopis: {fields['description']}"
+        )
+    problems_text = "\n".join(problem_lines)
 
     user_message = f"""Prosím poskytni konkrétní doporučení pro každý z těchto potvrzených problémů:
 
 {problems_text}"""
+    return [{"role": "user", "content": user_message}]
 
-    logger.info("Calling Claude API with structured output for recommendations")
 
-    response = await client.beta.messages.create(
-        model=MODEL,
-        max_tokens=1024,
-        betas=["structured-outputs-2025-11-13"],
-        system=system_prompt,
-        messages=[
-            {"role": "user", "content": user_message}
-        ],
-        output_format={
-            "type": "json_schema",
-            "schema": {
-                "type": "object",
-                "properties": {
-                    "recommendations": {
-                        "type": "array",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "problem_id": {"type": "integer"},
-                                "advice": {"type": "string"}
-                            },
-                            "required": ["problem_id", "advice"],
-                            "additionalProperties": False
-                        }
-                    }
-                },
-                "required": ["recommendations"],
-                "additionalProperties": False
-            }
-        }
-    )
-
-    logger.info(f"Response stop_reason: {response.stop_reason}")
+async def _generate_recommendations(
+    problems: list[dict[str, Any]], priority: str
+) -> list[dict[str, Any]]:
+    """Call Claude AI to generate recommendations for the given problems.
 
-    # Parse the structured response
-    response_text = response.content[0].text
-    logger.info(f"Structured response: {response_text[:500]}")
+    Args:
+        problems: A list of problem dictionaries (see `get_recommendations`).
+        priority: Scheduler class for the API call.
 
-    result = json.loads(response_text)
-    recommendations = result["recommendations"]
+    Returns:
+        A list of recommendations as returned by the API.
 
+    Raises:
+        ValueError: If the API response is invalid.
+        anthropic.APIError: If the API call fails.
+    """
+    logger.info("Calling Claude API with structured output for recommendations")
+    _, recommendations = await _call_structured(
+        priority,
+        RECOMMEND_SYSTEM_PROMPT,
+        _recommendation_messages(problems),
+        RECOMMENDATIONS_SCHEMA,
+        max_output_tokens(len(problems), RECOMMENDATION_MAX_CHARS, endpoint="recommend"),
+        "recommendations",
+    )
     return recommendations
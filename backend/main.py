@@ -1,25 +1,45 @@
 """Life Coach App - FastAPI Backend."""
 
+import asyncio
+import hmac
 import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-
-from llm import analyze_problems, get_recommendations
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field
+
+from body_limit import BodySizeLimitMiddleware, max_body_size_from_env
+from compression import CompressionMiddleware, compression_settings_from_env
+from http_cache import ResultCache, etag_matches, result_id
+from llm import analyze_problems, get_recommendations, recommendation_store, shared_store
+from metrics import metrics
+from profiling import ProfilingMiddleware, profiler
+from shared_state import call_store
+from tracing import TracedRoute, TracingMiddleware, tracer
+from watchdog import LoopWatchdog
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Input size limits, checked during validation before any LLM call
+ANSWER_MAX_CHARS = int(os.getenv("ANSWER_MAX_CHARS", "5000"))
+PROBLEM_TITLE_MAX_CHARS = int(os.getenv("PROBLEM_TITLE_MAX_CHARS", "200"))
+PROBLEM_DESCRIPTION_MAX_CHARS = int(os.getenv("PROBLEM_DESCRIPTION_MAX_CHARS", "1000"))
+MAX_PROBLEMS_PER_REQUEST = int(os.getenv("MAX_PROBLEMS_PER_REQUEST", "10"))
+
 
 # Pydantic models
 class AnalyzeRequest(BaseModel):
     """Request model for problem analysis."""
 
-    feeling: str
-    troubles: str
-    changes: str
+    feeling: str = Field(max_length=ANSWER_MAX_CHARS)
+    troubles: str = Field(max_length=ANSWER_MAX_CHARS)
+    changes: str = Field(max_length=ANSWER_MAX_CHARS)
 
 
 class Problem(BaseModel):
@@ -30,6 +50,13 @@ class Problem(BaseModel):
     description: str
 
 
+class ProblemInput(Problem):
+    """Problem sent by the client, with length limits checked before any LLM call."""
+
+    title: str = Field(max_length=PROBLEM_TITLE_MAX_CHARS)
+    description: str = Field(max_length=PROBLEM_DESCRIPTION_MAX_CHARS)
+
+
 class AnalyzeResponse(BaseModel):
     """Response model for problem analysis."""
 
@@ -39,7 +66,7 @@ class AnalyzeResponse(BaseModel):
 class RecommendRequest(BaseModel):
     """Request model for recommendations."""
 
-    problems: list[Problem]
+    problems: list[ProblemInput] = Field(max_length=MAX_PROBLEMS_PER_REQUEST)
 
 
 class Recommendation(BaseModel):
@@ -54,19 +81,118 @@ class RecommendResponse(BaseModel):
 
     recommendations: list[Recommendation]
 
+
+class ProfilingSettings(BaseModel):
+    """Request model for profiler configuration."""
+
+    sample_rate: float = Field(ge=0.0, le=1.0)
+
+
+def is_admin_token(token: str | None) -> bool:
+    """Check a token against the `ADMIN_TOKEN` environment variable."""
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token or token is None:
+        return False
+    return hmac.compare_digest(token.encode(), admin_token.encode())
+
+
+async def require_admin(x_admin_token: str | None = Header(default=None)) -> None:
+    """Dependency that rejects requests without a valid admin token.
+
+    Raises:
+        HTTPException: 404 if admin endpoints are disabled, 403 if the token is wrong.
+    """
+    if not os.getenv("ADMIN_TOKEN"):
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+# Recommendation results addressable by a hash of the confirmed problems
+result_cache = ResultCache(
+    ttl=float(os.getenv("RESULT_CACHE_TTL_SECONDS", "86400")),
+    shared=shared_store,
+)
+
+# Event loop lag and blocking call detection; sync I/O checks in development only
+watchdog = LoopWatchdog(
+    interval=float(os.getenv("LOOP_WATCHDOG_INTERVAL", "0.1")),
+    threshold=float(os.getenv("LOOP_WATCHDOG_THRESHOLD", "0.25")),
+    detect_sync_io=os.getenv("APP_ENV") == "development",
+)
+
+
+# Seconds between flushes of store statistics and purges of expired shared state
+SHARED_STATE_MAINTENANCE_SECONDS = float(os.getenv("SHARED_STATE_MAINTENANCE_SECONDS", "60"))
+
+
+async def maintain_shared_state() -> None:
+    """Flush store statistics and purge expired shared entries, off the event loop."""
+    await asyncio.to_thread(recommendation_store.flush_stats)
+    if shared_store is not None:
+        purged = await asyncio.to_thread(shared_store.purge_expired)
+        metrics.increment("shared_state.purged", purged)
+
+
+async def _maintenance_loop() -> None:
+    while True:
+        await asyncio.sleep(SHARED_STATE_MAINTENANCE_SECONDS)
+        try:
+            await maintain_shared_state()
+        except Exception as e:
+            logger.warning(f"Shared state maintenance failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Start background monitoring and maintenance with the app, stop them on shutdown."""
+    if watchdog.interval > 0:
+        watchdog.start()
+    maintenance = None
+    if shared_store is not None:
+        maintenance = asyncio.create_task(_maintenance_loop())
+    yield
+    if maintenance is not None:
+        maintenance.cancel()
+        try:
+            await maintenance
+        except asyncio.CancelledError:
+            pass
+        await maintain_shared_state()
+    await watchdog.stop()
+
+
 app = FastAPI(
     title="Life Coach App",
     description="AI-powered life coaching assistant",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
-# Configure CORS for frontend development
+# Time request validation and response serialization of every route
+app.router.route_class = TracedRoute
+
+# Compress large JSON responses (gzip, or brotli when installed)
+app.add_middleware(CompressionMiddleware, **compression_settings_from_env())
+
+# Sampled and on-demand request profiling
+app.add_middleware(ProfilingMiddleware, profiler=profiler, authorize=is_admin_token)
+
+# Server spans for every request (no-op unless TRACE_EXPORTER is set)
+app.add_middleware(TracingMiddleware, tracer=tracer)
+
+# Reject oversized request bodies while they stream in, before anything else reads them
+app.add_middleware(BodySizeLimitMiddleware, max_body_size=max_body_size_from_env())
+
+# Configure CORS for frontend development; outermost, so 413 responses carry CORS headers
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the frontend read the result location and validator of POST /api/recommend
+    expose_headers=["ETag", "Content-Location"],
 )
 
 
@@ -76,6 +202,92 @@ async def health_check() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics", dependencies=[Depends(require_admin)])
+async def get_metrics() -> dict[str, Any]:
+    """Metrics endpoint with counters, gauges and recommendation store hit rates.
+
+    Requires the admin token, like the profiling endpoints.
+    """
+    return {
+        **metrics.snapshot(),
+        "recommendation_store": await call_store(recommendation_store, "stats"),
+    }
+
+
+@app.get("/admin/profiling", dependencies=[Depends(require_admin)])
+async def get_profiling_status() -> dict[str, Any]:
+    """Return profiler configuration and collected profile counts.
+
+    Profiles are per worker process; with several workers, each request may
+    reach a different one. The `pid` field identifies the worker answering.
+    """
+    return profiler.status()
+
+
+@app.put("/admin/profiling", dependencies=[Depends(require_admin)])
+async def update_profiling(settings: ProfilingSettings) -> dict[str, Any]:
+    """Change the fraction of requests sampled into the aggregate profile.
+
+    Only the worker process handling this request is changed; the `pid`
+    field of the response identifies it. Set `PROFILE_SAMPLE_RATE` to
+    configure all workers.
+    """
+    profiler.sample_rate = settings.sample_rate
+    logger.info(f"Profiling sample rate set to {settings.sample_rate}")
+    return profiler.status()
+
+
+@app.get(
+    "/admin/profiling/stacks",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(require_admin)],
+)
+async def get_profiling_stacks() -> str:
+    """Return the aggregate profile as flamegraph-compatible collapsed stacks.
+
+    Only time the event loop spent running a sampled request is included;
+    idle waits and concurrent unsampled requests are not. The profile covers
+    the worker process handling this request only.
+    """
+    return profiler.aggregate_stacks()
+
+
+@app.delete("/admin/profiling/stacks", dependencies=[Depends(require_admin)])
+async def reset_profiling_stacks() -> dict[str, Any]:
+    """Drop all profiles collected by the worker process handling this request."""
+    profiler.reset()
+    return profiler.status()
+
+
+@app.get(
+    "/admin/profiling/requests/{profile_id}",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(require_admin)],
+)
+async def get_request_profile(profile_id: str) -> str:
+    """Return a single-request profile as collapsed stacks.
+
+    The profile covers the request's own coroutine only: time spent awaiting
+    I/O, other requests, and work moved to other tasks or threads is not
+    included. Profiles are kept by the worker process that served the
+    profiled request, so with several workers this may return 404 from
+    another worker.
+
+    Raises:
+        HTTPException: If no profile with this id is stored in this worker.
+    """
+    stacks = profiler.request_stacks(profile_id)
+    if stacks is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return stacks
+
+
+@app.get("/admin/watchdog", dependencies=[Depends(require_admin)])
+async def get_watchdog_report() -> dict[str, Any]:
+    """Return event loop watchdog settings and recent blocking reports."""
+    return watchdog.report()
+
+
 @app.post("/api/analyze", response_model=AnalyzeResponse)
 async def analyze(request: AnalyzeRequest) -> AnalyzeResponse:
     """Analyze user input and identify problems.
@@ -109,11 +321,16 @@ async def analyze(request: AnalyzeRequest) -> AnalyzeResponse:
 
 
 @app.post("/api/recommend", response_model=RecommendResponse)
-async def recommend(request: RecommendRequest) -> RecommendResponse:
+async def recommend(request: RecommendRequest, response: Response) -> RecommendResponse:
     """Get recommendations for identified problems.
 
+    The result is cached under a hash of the problems; its URL is returned in
+    the `Content-Location` header and its ETag in the `ETag` header. If the
+    cache write fails, the result is returned without these headers.
+
     Args:
         request: List of problems to get recommendations for.
+        response: Response used to set cache headers.
 
     Returns:
         List of recommendations for each problem.
@@ -126,7 +343,7 @@ async def recommend(request: RecommendRequest) -> RecommendResponse:
         # Convert Pydantic models to dicts for LLM module
         problems_dicts = [p.model_dump() for p in request.problems]
         recommendations = await get_recommendations(problems=problems_dicts)
-        return RecommendResponse(recommendations=recommendations)
+        result = RecommendResponse(recommendations=recommendations)
     except ValueError as e:
         logger.error(f"Validation error during recommendation: {e}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -136,3 +353,42 @@ async def recommend(request: RecommendRequest) -> RecommendResponse:
             status_code=500,
             detail="Failed to generate recommendations. Please try again later.",
         )
+
+    key = result_id(problems_dicts)
+    try:
+        with tracer.span("http_cache.put"):
+            etag = await call_store(result_cache, "put", key, result.model_dump())
+    except Exception as e:
+        # The result is still valid; it just cannot be fetched again by URL
+        logger.warning(f"Failed to cache recommendation result: {e}")
+        metrics.increment("http_cache.put_errors")
+        return result
+    response.headers["ETag"] = etag
+    response.headers["Content-Location"] = f"/api/recommend/{key}"
+    return result
+
+
+@app.get("/api/recommend/{result_key}", response_model=RecommendResponse)
+async def get_recommendation_result(
+    result_key: str, if_none_match: str | None = Header(default=None)
+) -> Response:
+    """Return a cached recommendation result by its id.
+
+    Args:
+        result_key: Result id from the `Content-Location` of `POST /api/recommend`.
+        if_none_match: ETags the client already has.
+
+    Returns:
+        The cached result, or 304 Not Modified if the client's ETag matches.
+
+    Raises:
+        HTTPException: If no result with this id is cached.
+    """
+    entry = await call_store(result_cache, "get", result_key)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Result not found")
+    headers = {"ETag": entry["etag"], "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, entry["etag"]):
+        metrics.increment("http_cache.not_modified")
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(entry["payload"], headers=headers)
@@ -0,0 +1,79 @@
+"""Metrics module for Life Coach App.
+
+This module provides a small in-process metrics registry with counters,
+gauges and timing summaries. The snapshot is served by the `/metrics`
+endpoint in `main.py`.
+"""
+
+import threading
+from typing import Any
+
+
+def _label_key(name: str, labels: dict[str, Any]) -> str:
+    """Build a flat metric key such as `name{a=1,b=2}`."""
+    if not labels:
+        return name
+    parts = ",".join(f"{k}={labels[k]}" for k in sorted(labels))
+    return f"{name}{{{parts}}}"
+
+
+class Metrics:
+    """Thread-safe registry of counters, gauges and summaries."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, float] = {}
+        self._summaries: dict[str, dict[str, float]] = {}
+
+    def increment(self, name: str, value: float = 1, **labels: Any) -> None:
+        """Increase a counter by `value`."""
+        key = _label_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """Set a gauge to `value`."""
+        key = _label_key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Record one observation in a count/sum/min/max summary."""
+        key = _label_key(name, labels)
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                self._summaries[key] = {
+                    "count": 1, "sum": value, "min": value, "max": value
+                }
+                return
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["min"] = min(summary["min"], value)
+            summary["max"] = max(summary["max"], value)
+
+    def counter(self, name: str, **labels: Any) -> float:
+        """Return the current value of a counter (0 if never incremented)."""
+        with self._lock:
+            return self._counters.get(_label_key(name, labels), 0)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return a copy of all metrics."""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "summaries": {k: dict(v) for k, v in self._summaries.items()},
+            }
+
+    def reset(self) -> None:
+        """Drop all recorded metrics."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._summaries.clear()
+
+
+# Process-wide registry
+metrics = Metrics()
@@ -0,0 +1,302 @@
+"""Profiling module for Life Coach App.
+
+This module provides a low-overhead sampling profiler for the FastAPI app.
+A background thread periodically captures the stack of the thread serving
+profiled requests and aggregates the stacks in the collapsed format
+understood by flamegraph tools (`frame;frame;frame count`).
+
+All requests share the event loop thread, so a sample is attributed to a
+request only when the request's own coroutine frame is on the sampled
+stack; samples of other requests and of the idle loop waiting in the
+selector are dropped. Work the request hands to other tasks or threads
+is not attributed to it.
+
+Profiler state is per worker process: each worker samples, aggregates and
+is configured on its own, and `Profiler.status()` reports the worker's PID.
+"""
+
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from types import FrameType
+from typing import Any, Callable, Iterator
+
+# Header asking for a single request to be profiled
+PROFILE_HEADER = b"x-profile"
+# Header carrying the admin token required by PROFILE_HEADER
+ADMIN_TOKEN_HEADER = b"x-admin-token"
+# Response header with the id of a single-request profile
+PROFILE_ID_HEADER = b"x-profile-id"
+
+
+def _frame_label(frame: Any) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def is_idle(frame: Any) -> bool:
+    """Return True if the innermost frame is the event loop waiting for I/O."""
+    return os.path.basename(frame.f_code.co_filename) == "selectors.py"
+
+
+def _on_stack(frame: Any, anchor: FrameType) -> bool:
+    while frame is not None:
+        if frame is anchor:
+            return True
+        frame = frame.f_back
+    return False
+
+
+def fold_stack(frame: Any) -> str:
+    """Fold a frame and its callers into a `root;...;leaf` string."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """Samples the stacks of registered threads from a background thread.
+
+    A session may be anchored to a frame, usually the frame of a coroutine
+    serving one request; it then only counts samples taken while that frame
+    is running. Samples of a thread idling in the selector are never
+    counted. The sampling thread only runs while at least one session is
+    active.
+    """
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._sessions: dict[int, tuple[int, Counter, FrameType | None]] = {}
+        self._ids = itertools.count()
+        self._thread: threading.Thread | None = None
+
+    def start_session(self, counter: Counter, anchor: FrameType | None = None) -> int:
+        """Start sampling the calling thread into `counter`.
+
+        Args:
+            counter: Receives the folded stacks.
+            anchor: Only count samples whose stack contains this frame.
+
+        Returns:
+            A session id to pass to `stop_session`.
+        """
+        session_id = next(self._ids)
+        with self._lock:
+            self._sessions[session_id] = (threading.get_ident(), counter, anchor)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="stack-sampler", daemon=True
+                )
+                self._thread.start()
+        return session_id
+
+    def stop_session(self, session_id: int) -> None:
+        """Stop a session started with `start_session`."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._sessions:
+                    self._thread = None
+                    return
+                self.sample()
+
+    def sample(self) -> None:
+        """Take one sample of every registered thread (lock must be held)."""
+        frames = sys._current_frames()
+        seen: set[tuple[int, int]] = set()
+        stacks: dict[int, str] = {}
+        for thread_id, counter, anchor in self._sessions.values():
+            if (thread_id, id(counter)) in seen:
+                continue
+            frame = frames.get(thread_id)
+            if frame is None or is_idle(frame):
+                continue
+            if anchor is not None and not _on_stack(frame, anchor):
+                continue
+            seen.add((thread_id, id(counter)))
+            if thread_id not in stacks:
+                stacks[thread_id] = fold_stack(frame)
+            counter[stacks[thread_id]] += 1
+
+    def read(self, counter: Counter) -> dict[str, int]:
+        """Return a consistent copy of a counter filled by this sampler."""
+        with self._lock:
+            return dict(counter)
+
+
+class Profiler:
+    """Request profiler with an aggregate profile and single-request profiles.
+
+    Requests are sampled with probability `sample_rate` into the aggregate
+    profile. A request can also be profiled on its own; the last
+    `max_request_profiles` such profiles are kept.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 0.0,
+        interval: float = 0.005,
+        max_request_profiles: int = 20,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.max_request_profiles = max_request_profiles
+        self.sampler = StackSampler(interval=interval)
+        self._aggregate: Counter = Counter()
+        self._request_profiles: OrderedDict[str, Counter] = OrderedDict()
+        self.sampled_requests = 0
+
+    def should_sample(self) -> bool:
+        """Decide whether the current request goes to the aggregate profile."""
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    @contextmanager
+    def profile_aggregate(self, anchor: FrameType | None = None) -> Iterator[None]:
+        """Sample the enclosed block into the aggregate profile.
+
+        Args:
+            anchor: Frame of the profiled coroutine; see `StackSampler`.
+        """
+        session_id = self.sampler.start_session(self._aggregate, anchor)
+        self.sampled_requests += 1
+        try:
+            yield
+        finally:
+            self.sampler.stop_session(session_id)
+
+    @contextmanager
+    def profile_request(self, anchor: FrameType | None = None) -> Iterator[str]:
+        """Sample the enclosed block into a new single-request profile.
+
+        Args:
+            anchor: Frame of the profiled coroutine; see `StackSampler`.
+
+        Yields:
+            The id under which the profile is stored.
+        """
+        profile_id = uuid.uuid4().hex
+        counter: Counter = Counter()
+        self._request_profiles[profile_id] = counter
+        while len(self._request_profiles) > self.max_request_profiles:
+            self._request_profiles.popitem(last=False)
+        session_id = self.sampler.start_session(counter, anchor)
+        try:
+            yield profile_id
+        finally:
+            self.sampler.stop_session(session_id)
+
+    def aggregate_stacks(self) -> str:
+        """Return the aggregate profile in collapsed stack format."""
+        return _collapse(self.sampler.read(self._aggregate))
+
+    def request_stacks(self, profile_id: str) -> str | None:
+        """Return a single-request profile in collapsed stack format."""
+        counter = self._request_profiles.get(profile_id)
+        if counter is None:
+            return None
+        return _collapse(self.sampler.read(counter))
+
+    def request_profile_ids(self) -> list[str]:
+        """Return the ids of stored single-request profiles, oldest first."""
+        return list(self._request_profiles)
+
+    def reset(self) -> None:
+        """Drop all collected profiles."""
+        with self.sampler._lock:
+            self._aggregate.clear()
+            self._request_profiles.clear()
+            self.sampled_requests = 0
+
+    def status(self) -> dict[str, Any]:
+        """Return the profiler configuration and counts of this worker process."""
+        return {
+            "pid": os.getpid(),
+            "sample_rate": self.sample_rate,
+            "interval": self.sampler.interval,
+            "sampled_requests": self.sampled_requests,
+            "samples": sum(self.sampler.read(self._aggregate).values()),
+            "request_profiles": self.request_profile_ids(),
+        }
+
+
+def _collapse(counter: dict[str, int]) -> str:
+    return "".join(
+        f"{stack} {count}\n" for stack, count in sorted(counter.items())
+    )
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles sampled or explicitly requested requests.
+
+    A request is profiled on its own when it carries `X-Profile: 1` and an
+    `X-Admin-Token` accepted by `authorize`; the profile id is returned in
+    the `X-Profile-Id` response header. When the sample rate is zero and the
+    header is absent, the request is passed through untouched.
+
+    Samples are anchored to this middleware's frame, so a profile only
+    contains time the event loop spent running the request itself.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        profiler: Profiler,
+        authorize: Callable[[str | None], bool],
+    ) -> None:
+        self.app = app
+        self.profiler = profiler
+        self.authorize = authorize
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        requested = False
+        token = None
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                requested = value == b"1"
+            elif name == ADMIN_TOKEN_HEADER:
+                token = value.decode("latin-1")
+
+        anchor = sys._getframe()
+        if requested and self.authorize(token):
+            with self.profiler.profile_request(anchor) as profile_id:
+                await self.app(scope, receive, _with_header(send, profile_id))
+        elif self.profiler.should_sample():
+            with self.profiler.profile_aggregate(anchor):
+                await self.app(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+
+def _with_header(send: Callable, profile_id: str) -> Callable:
+    async def wrapped(message: dict) -> None:
+        if message["type"] == "http.response.start":
+            message["headers"] = [
+                *message.get("headers", []),
+                (PROFILE_ID_HEADER, profile_id.encode("latin-1")),
+            ]
+        await send(message)
+
+    return wrapped
+
+
+# Process-wide profiler, configured from the environment
+profiler = Profiler(
+    sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+    interval=float(os.getenv("PROFILE_INTERVAL_SECONDS", "0.005")),
+)
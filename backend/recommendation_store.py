@@ -0,0 +1,320 @@
+"""Recommendation store for Life Coach App.
+
+This module keeps generated advice indexed by the normalized problem title
+and description, so recurring problems can be answered without calling
+Claude AI again. Hit/miss statistics are keyed by an opaque hash of the
+problem, so they never expose what users wrote.
+"""
+
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable
+
+from shared_state import SharedStore
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for use in a store key.
+
+    Applies Unicode NFKC normalization, case folding, whitespace collapsing
+    and strips trailing punctuation.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = _WHITESPACE_RE.sub(" ", text).strip()
+    return text.rstrip(".!?…;:, ")
+
+
+def problem_key(problem: dict[str, Any]) -> str:
+    """Return the store key for a problem dictionary."""
+    return f"{normalize_text(problem['title'])}\n{normalize_text(problem['description'])}"
+
+
+def stats_id(key: str) -> str:
+    """Return the opaque identifier used for a store key in statistics."""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def _hit_rate(hits: int, misses: int) -> float:
+    total = hits + misses
+    return hits / total if total else 0.0
+
+
+def summarize_stats(
+    counts: dict[str, dict[str, int]], hits: int, misses: int, entries: int, top: int
+) -> dict[str, Any]:
+    """Build the statistics report from per-problem counts and totals."""
+    busiest = sorted(
+        counts.items(), key=lambda item: item[1]["hits"] + item[1]["misses"], reverse=True
+    )[:top]
+    return {
+        "entries": entries,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": _hit_rate(hits, misses),
+        "top": [
+            {"id": key, **count, "hit_rate": _hit_rate(count["hits"], count["misses"])}
+            for key, count in busiest
+        ],
+    }
+
+
+class RecommendationStore:
+    """Bounded LRU store of advice keyed by normalized problem.
+
+    Entries older than `refresh_after` seconds are still served, but are
+    reported as stale so the caller can refresh them in the background.
+    Per-problem statistics are bounded by the same LRU limit as the entries.
+    """
+
+    # Whether methods do blocking I/O and should run off the event loop
+    does_io = False
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        refresh_after: float = 24 * 60 * 60,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.refresh_after = refresh_after
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._stats: OrderedDict[str, dict[str, int]] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._refreshing: set[str] = set()
+
+    def _record(self, key: str, kind: str) -> None:
+        """Count a hit or miss; must be called with the lock held."""
+        stats_key = stats_id(key)
+        stats = self._stats.setdefault(stats_key, {"hits": 0, "misses": 0})
+        self._stats.move_to_end(stats_key)
+        stats[kind] += 1
+        if kind == "hits":
+            self._hits += 1
+        else:
+            self._misses += 1
+        while len(self._stats) > self.max_entries:
+            self._stats.popitem(last=False)
+
+    def lookup(self, problem: dict[str, Any]) -> str | None:
+        """Return stored advice for a problem and record a hit or miss."""
+        key = problem_key(problem)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._record(key, "misses")
+                return None
+            self._entries.move_to_end(key)
+            self._record(key, "hits")
+            return entry["advice"]
+
+    def lookup_many(self, problems: list[dict[str, Any]]) -> list[tuple[str | None, bool]]:
+        """Look up several problems.
+
+        Returns:
+            One `(advice, stale)` pair per problem; advice is None on a miss.
+        """
+        results = []
+        for problem in problems:
+            advice = self.lookup(problem)
+            results.append((advice, advice is not None and self.is_stale(problem)))
+        return results
+
+    def is_stale(self, problem: dict[str, Any]) -> bool:
+        """Return True if the stored entry should be refreshed."""
+        key = problem_key(problem)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            return self._clock() - entry["created_at"] >= self.refresh_after
+
+    def put(self, problem: dict[str, Any], advice: str) -> None:
+        """Store advice for a problem, evicting the least recently used entry."""
+        key = problem_key(problem)
+        with self._lock:
+            self._entries[key] = {"advice": advice, "created_at": self._clock()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def put_many(self, items: list[tuple[dict[str, Any], str]]) -> None:
+        """Store advice for several `(problem, advice)` pairs."""
+        for problem, advice in items:
+            self.put(problem, advice)
+
+    def begin_refresh(self, problem: dict[str, Any]) -> bool:
+        """Mark a problem as being refreshed.
+
+        Returns:
+            False if a refresh for the same problem is already running.
+        """
+        key = problem_key(problem)
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, problem: dict[str, Any]) -> None:
+        """Clear the refresh mark set by `begin_refresh`."""
+        with self._lock:
+            self._refreshing.discard(problem_key(problem))
+
+    def stats(self, top: int = 20) -> dict[str, Any]:
+        """Return total hit/miss counts and the `top` most looked-up problems.
+
+        Problems are identified by `stats_id`, never by their text.
+        """
+        with self._lock:
+            counts = {key: dict(count) for key, count in self._stats.items()}
+            return summarize_stats(counts, self._hits, self._misses, len(self._entries), top)
+
+    def flush_stats(self) -> None:
+        """Persist statistics recorded since the last flush; a no-op here."""
+
+    def clear(self) -> None:
+        """Remove all entries and statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._stats.clear()
+            self._hits = 0
+            self._misses = 0
+            self._refreshing.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class SharedRecommendationStore(RecommendationStore):
+    """Recommendation store kept in a `SharedStore`, shared by all workers.
+
+    Entries, hit/miss counters and refresh marks live in the shared store,
+    so every worker process benefits from advice generated by any other.
+    All of them are keyed by `stats_id`, so problem text is never stored.
+    Instead of LRU eviction, entries expire `expire_after` seconds after
+    they were stored.
+
+    Lookups only read the database. Hits and misses are counted in process
+    memory and written by `flush_stats`, in one transaction per flush; the
+    counters expire `expire_after` seconds after they were created. All
+    methods do SQLite I/O and may wait for the write lock, so callers on the
+    event loop should run them in a worker thread.
+    """
+
+    does_io = True
+
+    def __init__(
+        self,
+        shared: SharedStore,
+        refresh_after: float = 24 * 60 * 60,
+        expire_after: float | None = None,
+        prefix: str = "recommendation",
+        refresh_timeout: float = 120,
+        max_stats_rows: int = 10_000,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        super().__init__(refresh_after=refresh_after, clock=clock)
+        self.shared = shared
+        self.expire_after = expire_after if expire_after is not None else 2 * refresh_after
+        self.prefix = prefix
+        self.refresh_timeout = refresh_timeout
+        self.max_stats_rows = max_stats_rows
+        self._pending: dict[str, int] = {}
+
+    def _key(self, kind: str, key: str) -> str:
+        return f"{self.prefix}:{kind}:{key}"
+
+    def _problem_key(self, kind: str, problem: dict[str, Any]) -> str:
+        # Keyed by digest so problem text never appears in the database keys
+        return self._key(kind, stats_id(problem_key(problem)))
+
+    def _count(self, kind: str, key: str) -> None:
+        with self._lock:
+            for counter in (self._key(kind, stats_id(key)), self._key("total", kind)):
+                self._pending[counter] = self._pending.get(counter, 0) + 1
+
+    def lookup(self, problem: dict[str, Any]) -> str | None:
+        key = problem_key(problem)
+        entry = self.shared.get(self._key("entry", stats_id(key)))
+        if entry is None:
+            self._count("misses", key)
+            return None
+        self._count("hits", key)
+        return entry["advice"]
+
+    def lookup_many(self, problems: list[dict[str, Any]]) -> list[tuple[str | None, bool]]:
+        results = []
+        for problem in problems:
+            key = problem_key(problem)
+            entry = self.shared.get(self._key("entry", stats_id(key)))
+            if entry is None:
+                self._count("misses", key)
+                results.append((None, False))
+                continue
+            self._count("hits", key)
+            stale = self._clock() - entry["created_at"] >= self.refresh_after
+            results.append((entry["advice"], stale))
+        return results
+
+    def is_stale(self, problem: dict[str, Any]) -> bool:
+        entry = self.shared.get(self._problem_key("entry", problem))
+        if entry is None:
+            return False
+        return self._clock() - entry["created_at"] >= self.refresh_after
+
+    def put(self, problem: dict[str, Any], advice: str) -> None:
+        self.shared.set(
+            self._problem_key("entry", problem),
+            {"advice": advice, "created_at": self._clock()},
+            ttl=self.expire_after,
+        )
+
+    def begin_refresh(self, problem: dict[str, Any]) -> bool:
+        return self.shared.add(
+            self._problem_key("refreshing", problem), True, ttl=self.refresh_timeout
+        )
+
+    def end_refresh(self, problem: dict[str, Any]) -> None:
+        self.shared.delete(self._problem_key("refreshing", problem))
+
+    def flush_stats(self) -> None:
+        """Add the counts recorded since the last flush to the shared counters."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if pending:
+            self.shared.incr_many(pending, ttl=self.expire_after)
+
+    def stats(self, top: int = 20) -> dict[str, Any]:
+        """Return flushed totals and the busiest of a bounded scan of problems.
+
+        At most `max_stats_rows` counters of each kind are scanned; since
+        they are keyed by hash, the scanned rows are a uniform sample.
+        """
+        counts: dict[str, dict[str, int]] = {}
+        for kind in ("hits", "misses"):
+            prefix = self._key(kind, "")
+            rows = self.shared.items(prefix, limit=self.max_stats_rows)
+            for full_key, value in rows.items():
+                count = counts.setdefault(full_key[len(prefix):], {"hits": 0, "misses": 0})
+                count[kind] = value
+        hits = self.shared.get(self._key("total", "hits"), 0)
+        misses = self.shared.get(self._key("total", "misses"), 0)
+        return summarize_stats(counts, hits, misses, self.shared.count(self._key("entry", "")), top)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending.clear()
+        self.shared.delete_prefix(f"{self.prefix}:")
+
+    def __len__(self) -> int:
+        return self.shared.count(self._key("entry", ""))
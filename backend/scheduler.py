@@ -0,0 +1,156 @@
+"""Scheduler module for Life Coach App.
+
+This module schedules Claude AI calls by priority class so bulk and
+background work cannot drive up the latency of interactive requests.
+Queued work is dispatched by weighted fair queuing across classes, queued
+interactive work always goes before queued work of other classes, and each
+class has its own concurrency cap.
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable
+
+from metrics import metrics
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+BATCH = "batch"
+
+# Share of dispatches each class gets when several classes are queued
+DEFAULT_WEIGHTS = {INTERACTIVE: 8, BACKGROUND: 2, BATCH: 1}
+
+# Maximum number of concurrent calls per class, as a fraction of the total
+DEFAULT_CAP_FRACTIONS = {INTERACTIVE: 1.0, BACKGROUND: 0.5, BATCH: 0.25}
+
+
+class LLMScheduler:
+    """Priority-aware limiter for concurrent LLM calls.
+
+    Args:
+        max_concurrency: Maximum number of concurrent calls across all classes.
+        weights: Weighted fair queuing weight per priority class.
+        caps: Maximum concurrent calls per class; derived from
+            `max_concurrency` by default.
+        preemptive: Classes whose queued work is dispatched before queued
+            work of any other class.
+        clock: Time source used for wait time metrics.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        weights: dict[str, float] | None = None,
+        caps: dict[str, int] | None = None,
+        preemptive: tuple[str, ...] = (INTERACTIVE,),
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self.caps = dict(caps or {
+            name: max(1, int(max_concurrency * DEFAULT_CAP_FRACTIONS.get(name, 1.0)))
+            for name in self.weights
+        })
+        self.preemptive = preemptive
+        self._clock = clock
+        self._queues: dict[str, deque[asyncio.Future]] = {
+            name: deque() for name in self.weights
+        }
+        self._running: dict[str, int] = {name: 0 for name in self.weights}
+        self._finish_tags: dict[str, float] = {name: 0.0 for name in self.weights}
+        self._virtual_time = 0.0
+
+    @property
+    def running(self) -> int:
+        """Number of calls currently holding a slot."""
+        return sum(self._running.values())
+
+    def queued(self, priority: str) -> int:
+        """Number of calls of a class waiting for a slot."""
+        return sum(1 for f in self._queues[priority] if not f.cancelled())
+
+    @asynccontextmanager
+    async def slot(self, priority: str = INTERACTIVE) -> AsyncIterator[None]:
+        """Wait for a slot for one call of the given priority class.
+
+        Raises:
+            ValueError: If the priority class is unknown.
+        """
+        if priority not in self.weights:
+            raise ValueError(f"Unknown priority class: {priority}")
+
+        start = self._clock()
+        if (
+            self.running < self.max_concurrency
+            and self._running[priority] < self.caps[priority]
+            and not self._queues[priority]
+        ):
+            self._start(priority)
+        else:
+            await self._wait(priority)
+        metrics.observe("scheduler.wait_seconds", self._clock() - start, priority=priority)
+
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    async def _wait(self, priority: str) -> None:
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues[priority]
+        queue.append(future)
+        self._report(priority)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was granted just before cancellation; hand it on
+                self._release(priority)
+            elif future in queue:
+                queue.remove(future)
+                self._report(priority)
+            raise
+
+    def _start(self, priority: str) -> None:
+        self._running[priority] += 1
+        tag = max(self._virtual_time, self._finish_tags[priority])
+        self._finish_tags[priority] = tag + 1 / self.weights[priority]
+        self._virtual_time = tag
+        self._report(priority)
+
+    def _release(self, priority: str) -> None:
+        self._running[priority] -= 1
+        self._report(priority)
+        self._dispatch()
+
+    def _pick(self) -> str | None:
+        eligible = [
+            name for name, queue in self._queues.items()
+            if queue and self._running[name] < self.caps[name]
+        ]
+        if not eligible:
+            return None
+        for name in self.preemptive:
+            if name in eligible:
+                return name
+        return min(
+            eligible,
+            key=lambda name: max(self._virtual_time, self._finish_tags[name]),
+        )
+
+    def _dispatch(self) -> None:
+        while self.running < self.max_concurrency:
+            priority = self._pick()
+            if priority is None:
+                return
+            future = self._queues[priority].popleft()
+            if future.cancelled():
+                continue
+            self._start(priority)
+            future.set_result(None)
+
+    def _report(self, priority: str) -> None:
+        metrics.set_gauge("scheduler.running", self._running[priority], priority=priority)
+        metrics.set_gauge("scheduler.queued", self.queued(priority), priority=priority)
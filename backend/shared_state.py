@@ -0,0 +1,223 @@
+"""Shared state module for Life Coach App.
+
+This module provides a key/value store shared by all worker processes of
+one host, backed by an SQLite database in WAL mode with memory-mapped I/O.
+Readers never block each other or the writer, so caches, rate limiters and
+in-flight deduplication keep working across uvicorn/gunicorn workers
+without an external service. Writers serialize on one database lock and
+may wait up to `busy_timeout_ms` for it, so code on the event loop should
+write from a worker thread (`asyncio.to_thread`).
+
+Set `SHARED_STATE_PATH` to enable it for the running app.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value,
+    expires_at REAL
+) WITHOUT ROWID
+"""
+
+# Adds to a counter; an expired counter restarts from the added amount
+_INCR_SQL = """
+INSERT INTO entries (key, value, expires_at) VALUES (?, ?, ?)
+ON CONFLICT(key) DO UPDATE SET
+    value = CASE WHEN entries.expires_at IS NOT NULL AND entries.expires_at <= ?
+        THEN excluded.value ELSE entries.value + excluded.value END,
+    expires_at = CASE WHEN entries.expires_at IS NOT NULL AND entries.expires_at <= ?
+        THEN excluded.expires_at ELSE entries.expires_at END
+"""
+
+
+class SharedStore:
+    """Cross-process store of keyed entries, counters and TTLs.
+
+    Values set with `set`/`add` are stored as JSON; counters updated with
+    `incr` are stored as integers. Expired entries are ignored on read and
+    removed by `purge_expired`.
+
+    Args:
+        path: Database file; all processes sharing state must use the same path.
+        mmap_size: Bytes of the database file to memory-map for reads.
+        busy_timeout_ms: How long a writer waits for the write lock.
+        clock: Wall-clock time source, shared across processes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mmap_size: int = 64 * 1024 * 1024,
+        busy_timeout_ms: int = 5000,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = path
+        self.mmap_size = mmap_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self._clock = clock
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, reopening it after a fork."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _expires_at(self, ttl: float | None) -> float | None:
+        return None if ttl is None else self._clock() + ttl
+
+    @staticmethod
+    def _decode(value: Any) -> Any:
+        return json.loads(value) if isinstance(value, str) else value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the value for `key`, or `default` if missing or expired."""
+        row = self._connection().execute(
+            "SELECT value FROM entries WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, self._clock()),
+        ).fetchone()
+        return default if row is None else self._decode(row[0])
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        """Store a JSON-serializable value, optionally expiring after `ttl` seconds."""
+        self._connection().execute(
+            "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), self._expires_at(ttl)),
+        )
+
+    def add(self, key: str, value: Any, ttl: float | None = None) -> bool:
+        """Store a value only if `key` is missing or expired.
+
+        Returns:
+            True if the value was stored, False if a live entry already exists.
+        """
+        cursor = self._connection().execute(
+            """
+            INSERT INTO entries (key, value, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                value = excluded.value, expires_at = excluded.expires_at
+            WHERE entries.expires_at IS NOT NULL AND entries.expires_at <= ?
+            """,
+            (key, json.dumps(value, ensure_ascii=False), self._expires_at(ttl), self._clock()),
+        )
+        return cursor.rowcount > 0
+
+    def incr(self, key: str, amount: int = 1, ttl: float | None = None) -> int:
+        """Atomically add `amount` to a counter and return the new value.
+
+        A missing or expired counter starts from zero and gets `ttl`;
+        an existing counter keeps its original expiry (fixed window).
+        """
+        now = self._clock()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(_INCR_SQL, (key, amount, self._expires_at(ttl), now, now))
+            value = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()[0]
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return int(value)
+
+    def incr_many(self, amounts: dict[str, int], ttl: float | None = None) -> None:
+        """Add amounts to several counters in one transaction.
+
+        Each counter follows the same fixed-window rules as `incr`.
+        """
+        now = self._clock()
+        expires_at = self._expires_at(ttl)
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                _INCR_SQL,
+                [(key, amount, expires_at, now, now) for key, amount in amounts.items()],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, key: str) -> None:
+        """Remove `key` if present."""
+        self._connection().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def items(self, prefix: str, limit: int | None = None) -> dict[str, Any]:
+        """Return live entries whose key starts with `prefix`.
+
+        Args:
+            prefix: Key prefix to match.
+            limit: Return at most this many entries, in key order.
+        """
+        rows = self._connection().execute(
+            "SELECT key, value FROM entries WHERE key >= ? AND key < ? "
+            "AND (expires_at IS NULL OR expires_at > ?) ORDER BY key LIMIT ?",
+            (prefix, prefix + "\U0010ffff", self._clock(), -1 if limit is None else limit),
+        ).fetchall()
+        return {key: self._decode(value) for key, value in rows}
+
+    def count(self, prefix: str) -> int:
+        """Return the number of live entries whose key starts with `prefix`."""
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM entries WHERE key >= ? AND key < ? "
+            "AND (expires_at IS NULL OR expires_at > ?)",
+            (prefix, prefix + "\U0010ffff", self._clock()),
+        ).fetchone()[0]
+
+    def delete_prefix(self, prefix: str) -> None:
+        """Remove all entries whose key starts with `prefix`."""
+        self._connection().execute(
+            "DELETE FROM entries WHERE key >= ? AND key < ?",
+            (prefix, prefix + "\U0010ffff"),
+        )
+
+    def purge_expired(self) -> int:
+        """Delete expired entries and return how many were removed."""
+        cursor = self._connection().execute(
+            "DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?",
+            (self._clock(),),
+        )
+        return cursor.rowcount
+
+    def close(self) -> None:
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+async def call_store(store: Any, method: str, *args: Any) -> Any:
+    """Call `store.<method>(*args)`, in a worker thread if `store.does_io`.
+
+    Keeps SQLite reads and write-lock waits off the event loop, while
+    in-memory stores are called directly.
+    """
+    func = getattr(store, method)
+    if store.does_io:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
+
+
+def shared_store_from_env() -> SharedStore | None:
+    """Create the process-wide store from `SHARED_STATE_PATH`, if configured."""
+    path = os.getenv("SHARED_STATE_PATH")
+    return SharedStore(path) if path else None
@@ -254,3 +254,30 @@ async def test_recommend_endpoint_empty_problems_list():
         assert response.status_code == 200
         data = response.json()
         assert data["recommendations"] == []
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(monkeypatch):
+    """Test that metrics endpoint exposes counters and store hit rates."""
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get("/metrics", headers={"X-Admin-Token": "secret"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert "counters" in data
+    assert set(data["recommendation_store"]) >= {"hits", "misses", "hit_rate", "top"}
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_requires_admin_token(monkeypatch):
+    """Test that metrics are not served without the admin token."""
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get("/metrics")
+
+    assert response.status_code == 403
@@ -0,0 +1,181 @@
+"""Tests for the request body limit middleware and input constraints."""
+
+import pytest
+from fastapi import FastAPI, Request
+from httpx import ASGITransport, AsyncClient, Response
+from unittest.mock import AsyncMock, patch
+
+from body_limit import BodySizeLimitMiddleware
+from main import ANSWER_MAX_CHARS, MAX_PROBLEMS_PER_REQUEST, PROBLEM_TITLE_MAX_CHARS, app
+from metrics import metrics
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    """Start each test with empty metrics."""
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def create_app(max_body_size: int = 100) -> FastAPI:
+    """Create a small echo app behind the middleware."""
+    test_app = FastAPI()
+
+    @test_app.post("/echo")
+    async def echo(request: Request) -> dict:
+        return {"size": len(await request.body())}
+
+    test_app.add_middleware(BodySizeLimitMiddleware, max_body_size=max_body_size)
+    return test_app
+
+
+async def post(test_app: FastAPI, **kwargs) -> Response:
+    """POST to the echo route of `test_app`."""
+    async with AsyncClient(
+        transport=ASGITransport(app=test_app), base_url="http://test"
+    ) as client:
+        return await client.post("/echo", **kwargs)
+
+
+async def chunks(count: int, size: int):
+    """Stream a body without Content-Length."""
+    for _ in range(count):
+        yield b"x" * size
+
+
+@pytest.mark.asyncio
+async def test_body_within_limit_passes():
+    """Test that bodies up to the limit reach the application."""
+    response = await post(create_app(), content=b"x" * 100)
+    assert response.status_code == 200
+    assert response.json() == {"size": 100}
+
+
+@pytest.mark.asyncio
+async def test_declared_oversized_body_is_rejected():
+    """Test that a Content-Length above the limit is rejected with 413."""
+    response = await post(create_app(), content=b"x" * 101)
+    assert response.status_code == 413
+    assert metrics.counter("body_limit.rejected", reason="content_length") == 1
+
+
+@pytest.mark.asyncio
+async def test_streamed_oversized_body_is_rejected():
+    """Test that a chunked body is cut off once it crosses the limit."""
+    response = await post(create_app(), content=chunks(10, 40))
+    assert response.status_code == 413
+    assert metrics.counter("body_limit.rejected", reason="streamed") == 1
+
+
+@pytest.mark.asyncio
+async def test_streamed_body_within_limit_passes():
+    """Test that a chunked body under the limit is delivered whole."""
+    response = await post(create_app(), content=chunks(2, 40))
+    assert response.status_code == 200
+    assert response.json() == {"size": 80}
+
+
+@pytest.mark.asyncio
+async def test_get_requests_are_not_limited():
+    """Test that bodiless methods pass through untouched."""
+    test_app = create_app()
+
+    @test_app.get("/ping")
+    async def ping() -> dict:
+        return {"ok": True}
+
+    async with AsyncClient(
+        transport=ASGITransport(app=test_app), base_url="http://test"
+    ) as client:
+        response = await client.get("/ping")
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_oversized_answer_is_rejected_before_llm_call():
+    """Test that an over-long answer fails validation without calling the LLM."""
+    with patch("main.analyze_problems", new_callable=AsyncMock) as mock_analyze:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            response = await client.post(
+                "/api/analyze",
+                json={
+                    "feeling": "a" * (ANSWER_MAX_CHARS + 1),
+                    "troubles": "b",
+                    "changes": "c",
+                },
+            )
+
+    assert response.status_code == 422
+    mock_analyze.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_too_many_problems_are_rejected_before_llm_call():
+    """Test that the problems list length is bounded."""
+    problems = [
+        {"id": i, "title": "t", "description": "d"}
+        for i in range(MAX_PROBLEMS_PER_REQUEST + 1)
+    ]
+    with patch("main.get_recommendations", new_callable=AsyncMock) as mock_recommend:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            response = await client.post("/api/recommend", json={"problems": problems})
+
+    assert response.status_code == 422
+    mock_recommend.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_oversized_body_is_rejected_by_app():
+    """Test that the app rejects huge bodies with 413 before validation."""
+    with patch("main.analyze_problems", new_callable=AsyncMock) as mock_analyze:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            response = await client.post(
+                "/api/analyze",
+                content=b'{"feeling": "' + b"a" * (4 * 1024 * 1024) + b'"}',
+                headers={"Content-Type": "application/json"},
+            )
+
+    assert response.status_code == 413
+    mock_analyze.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_rejection_carries_cors_headers():
+    """Test that browsers can read a 413 instead of seeing a CORS failure."""
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.post(
+            "/api/analyze",
+            content=b"x" * (4 * 1024 * 1024),
+            headers={"Content-Type": "application/json", "Origin": "http://localhost:3000"},
+        )
+
+    assert response.status_code == 413
+    assert response.headers["Access-Control-Allow-Origin"] == "http://localhost:3000"
+
+
+@pytest.mark.asyncio
+async def test_input_limits_do_not_apply_to_llm_output():
+    """Test that a long LLM-generated title is still returned by analyze."""
+    problems = [
+        {"id": i, "title": "t" * (PROBLEM_TITLE_MAX_CHARS + 1), "description": "d"}
+        for i in (1, 2, 3)
+    ]
+    with patch("main.analyze_problems", new=AsyncMock(return_value=problems)):
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            response = await client.post(
+                "/api/analyze", json={"feeling": "a", "troubles": "b", "changes": "c"}
+            )
+
+    assert response.status_code == 200
+    assert response.json()["problems"] == problems
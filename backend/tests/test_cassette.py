@@ -0,0 +1,167 @@
+"""Tests for the LLM cassette record/replay module."""
+
+import importlib.util
+import json
+import os
+import threading
+import time
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from cassette import (
+    CassetteMissError,
+    RecordingClient,
+    ReplayClient,
+    client_from_env,
+    load_cassette,
+    request_key,
+)
+from llm import analyze_problems
+from recommendation_store import RecommendationStore
+
+PROBLEMS = [
+    {"id": 1, "title": "Work Stress", "description": "Too much workload"},
+    {"id": 2, "title": "Sleep Issues", "description": "Cannot sleep well"},
+    {"id": 3, "title": "Social Isolation", "description": "Lack of friends"},
+]
+
+
+def fake_client(text: str) -> SimpleNamespace:
+    """Create a client returning a response with usage and stop_reason."""
+    response = SimpleNamespace(
+        content=[SimpleNamespace(text=text)],
+        stop_reason="end_turn",
+        usage=SimpleNamespace(input_tokens=120, output_tokens=80),
+    )
+    return SimpleNamespace(
+        beta=SimpleNamespace(messages=SimpleNamespace(create=AsyncMock(return_value=response)))
+    )
+
+
+def test_request_key_ignores_argument_order():
+    """Test that the request key is independent of keyword order."""
+    assert request_key({"a": 1, "b": [1, 2]}) == request_key({"b": [1, 2], "a": 1})
+    assert request_key({"a": 1}) != request_key({"a": 2})
+
+
+@pytest.mark.asyncio
+async def test_record_then_replay_analyze_problems(tmp_path):
+    """Test that a recorded analyze call replays identically without the API."""
+    path = str(tmp_path / "cassette.jsonl")
+    text = json.dumps({"problems": PROBLEMS})
+
+    with patch("llm.client", RecordingClient(fake_client(text), path)):
+        recorded = await analyze_problems(feeling="a", troubles="b", changes="c")
+
+    entries = load_cassette(path)
+    assert len(entries) == 1
+    assert entries[0]["response"]["stop_reason"] == "end_turn"
+    assert entries[0]["response"]["usage"] == {"input_tokens": 120, "output_tokens": 80}
+    assert entries[0]["request"]["model"]
+
+    replay = ReplayClient(entries)
+    with patch("llm.client", replay):
+        replayed = await analyze_problems(feeling="a", troubles="b", changes="c")
+
+    assert replayed == recorded
+    assert replay.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_recording_writes_off_the_event_loop(tmp_path):
+    """Test that cassette entries are written from a worker thread."""
+    path = str(tmp_path / "cassette.jsonl")
+    writer_threads = []
+
+    def write_entry(path: str, entry: dict) -> None:
+        writer_threads.append(threading.get_ident())
+
+    recorder = RecordingClient(fake_client(json.dumps({"problems": PROBLEMS})), path)
+    with patch("cassette.write_entry", write_entry):
+        await recorder.beta.messages.create(model="m", messages=[])
+
+    assert writer_threads and threading.get_ident() not in writer_threads
+
+
+@pytest.mark.asyncio
+async def test_replay_unknown_request_raises():
+    """Test that strict replay fails for requests not in the cassette."""
+    replay = ReplayClient([])
+    with pytest.raises(CassetteMissError):
+        await replay.beta.messages.create(model="m", messages=[])
+
+
+@pytest.mark.asyncio
+async def test_replay_sequence_mode_cycles_entries():
+    """Test that sequence mode serves entries in order regardless of request."""
+    entries = [
+        {"key": "a", "response": {"text": "first"}, "elapsed": 0},
+        {"key": "b", "response": {"text": "second"}, "elapsed": 0},
+    ]
+    replay = ReplayClient(entries, match="sequence")
+    texts = [
+        (await replay.beta.messages.create(x=i)).content[0].text for i in range(3)
+    ]
+    assert texts == ["first", "second", "first"]
+
+
+@pytest.mark.asyncio
+async def test_replay_original_timing_sleeps():
+    """Test that original timing waits for the recorded upstream time."""
+    entries = [{"key": "a", "response": {"text": "x"}, "elapsed": 0.05}]
+    replay = ReplayClient(entries, match="sequence", timing="original")
+    start = time.perf_counter()
+    await replay.beta.messages.create()
+    assert time.perf_counter() - start >= 0.05
+
+
+def test_client_from_env(monkeypatch, tmp_path):
+    """Test that the cassette mode is selected from the environment."""
+    original = object()
+    monkeypatch.delenv("LLM_CASSETTE_MODE", raising=False)
+    assert client_from_env(original) is original
+
+    path = tmp_path / "c.jsonl"
+    path.write_text("")
+    monkeypatch.setenv("LLM_CASSETTE_PATH", str(path))
+    monkeypatch.setenv("LLM_CASSETTE_MODE", "record")
+    assert isinstance(client_from_env(original), RecordingClient)
+    monkeypatch.setenv("LLM_CASSETTE_MODE", "replay")
+    assert isinstance(client_from_env(original), ReplayClient)
+
+
+def load_bench_replay():
+    """Import benchmarks/bench_replay.py, which is not a package module."""
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    path = os.path.join(backend, "benchmarks", "bench_replay.py")
+    spec = importlib.util.spec_from_file_location("bench_replay", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.asyncio
+async def test_replay_sequence_mode_matches_call_kind():
+    """Test that sequence mode serves entries of the requested schema key."""
+    bench = load_bench_replay()
+    replay = ReplayClient(bench.synthetic_entries(), match="sequence")
+    schema = {"output_format": {"schema": {"required": ["recommendations"]}}}
+    first = await replay.beta.messages.create(**schema)
+    second = await replay.beta.messages.create(**schema)
+    assert "recommendations" in json.loads(first.content[0].text)
+    assert "recommendations" in json.loads(second.content[0].text)
+
+
+@pytest.mark.asyncio
+async def test_bench_replay_with_kept_store():
+    """Test that replay stays in step when store hits skip recommend calls."""
+    bench = load_bench_replay()
+    with patch("llm.client"), patch("llm.recommendation_store", RecommendationStore()):
+        result = await bench.run(
+            bench.synthetic_entries(), sessions=3, timing="none", keep_store=True
+        )
+
+    assert result["sessions"] == 3
+    # A batch call and three single-problem store writes, then store hits only
+    assert result["llm_calls"] == 3 + 1 + 3
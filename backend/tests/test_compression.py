@@ -0,0 +1,96 @@
+"""Tests for the response compression middleware."""
+
+import gzip
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from httpx import ASGITransport, AsyncClient
+
+import compression
+from compression import CompressionMiddleware, parse_accept_encoding
+
+
+def create_app(minimum_size: int = 100) -> FastAPI:
+    """Create a small app with JSON and text routes behind the middleware."""
+    test_app = FastAPI()
+
+    @test_app.get("/big")
+    async def big() -> dict:
+        return {"advice": "Dělej pravidelné přestávky. " * 50}
+
+    @test_app.get("/small")
+    async def small() -> dict:
+        return {"ok": True}
+
+    @test_app.get("/text", response_class=PlainTextResponse)
+    async def text() -> str:
+        return "x" * 1000
+
+    test_app.add_middleware(CompressionMiddleware, minimum_size=minimum_size)
+    return test_app
+
+
+def test_parse_accept_encoding():
+    """Test q-value parsing of Accept-Encoding."""
+    assert parse_accept_encoding("gzip, br;q=0.5, identity;q=0") == {
+        "gzip": 1.0, "br": 0.5, "identity": 0.0
+    }
+
+
+@pytest.mark.asyncio
+async def test_large_json_is_gzipped(monkeypatch):
+    """Test that JSON above the threshold is gzip-compressed."""
+    monkeypatch.setattr(compression, "brotli", None)
+    async with AsyncClient(
+        transport=ASGITransport(app=create_app()), base_url="http://test"
+    ) as client:
+        response = await client.get("/big", headers={"Accept-Encoding": "gzip, br"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert int(response.headers["Content-Length"]) < len(response.content)
+    assert response.json()["advice"].startswith("Dělej")
+
+
+@pytest.mark.asyncio
+async def test_small_and_non_json_responses_are_not_compressed():
+    """Test that small bodies and other media types pass through."""
+    async with AsyncClient(
+        transport=ASGITransport(app=create_app()), base_url="http://test"
+    ) as client:
+        small = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+        text = await client.get("/text", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in small.headers
+    assert "Content-Encoding" not in text.headers
+
+
+@pytest.mark.asyncio
+async def test_no_compression_without_accept_encoding():
+    """Test that clients not accepting gzip get identity responses."""
+    async with AsyncClient(
+        transport=ASGITransport(app=create_app()), base_url="http://test"
+    ) as client:
+        response = await client.get("/big", headers={"Accept-Encoding": "identity"})
+
+    assert "Content-Encoding" not in response.headers
+
+
+def test_gzip_output_is_deterministic():
+    """Test that equal bodies compress to equal bytes."""
+    middleware = CompressionMiddleware(app=None)
+    body = b'{"a": 1}' * 100
+    assert middleware.compress(body, "gzip") == middleware.compress(body, "gzip")
+    assert gzip.decompress(middleware.compress(body, "gzip")) == body
+
+
+@pytest.mark.asyncio
+async def test_brotli_preferred_when_installed():
+    """Test that brotli is used when available and accepted."""
+    pytest.importorskip("brotli")
+    async with AsyncClient(
+        transport=ASGITransport(app=create_app()), base_url="http://test"
+    ) as client:
+        response = await client.get("/big", headers={"Accept-Encoding": "gzip, br"})
+
+    assert response.headers["Content-Encoding"] == "br"
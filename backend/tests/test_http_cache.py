@@ -0,0 +1,123 @@
+"""Tests for result caching, ETags and conditional GETs."""
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from unittest.mock import AsyncMock, patch
+
+from http_cache import ResultCache, compute_etag, etag_matches, result_id
+from main import app, result_cache
+from metrics import metrics
+
+PROBLEMS = [
+    {"id": 1, "title": "Work Stress", "description": "Overwhelmed by workload"},
+]
+RECOMMENDATIONS = [{"problem_id": 1, "advice": "Take regular breaks during work"}]
+
+
+def test_etag_is_deterministic():
+    """Test that equal payloads get equal ETags regardless of key order."""
+    assert compute_etag({"a": 1, "b": 2}) == compute_etag({"b": 2, "a": 1})
+    assert compute_etag({"a": 1}) != compute_etag({"a": 2})
+    assert compute_etag({"a": 1}).startswith('W/"')
+
+
+def test_etag_matches_uses_weak_comparison():
+    """Test If-None-Match parsing with lists, weak tags and wildcards."""
+    etag = compute_etag({"a": 1})
+    strong = etag.removeprefix("W/")
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", {strong}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_result_id_depends_on_request():
+    """Test that result ids are stable and input-specific."""
+    assert result_id(PROBLEMS) == result_id([dict(reversed(list(PROBLEMS[0].items())))])
+    assert result_id(PROBLEMS) != result_id([])
+
+
+def test_result_cache_is_bounded():
+    """Test that the in-memory result cache evicts old entries."""
+    cache = ResultCache(max_entries=1)
+    cache.put("a", {"x": 1})
+    cache.put("b", {"x": 2})
+    assert cache.get("a") is None
+    assert cache.get("b")["payload"] == {"x": 2}
+
+
+@pytest.mark.asyncio
+async def test_recommend_result_supports_conditional_get():
+    """Test POST exposes a result URL and ETag that GET revalidates with 304."""
+    with patch("main.get_recommendations", new_callable=AsyncMock) as mock_recommend:
+        mock_recommend.return_value = RECOMMENDATIONS
+
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            posted = await client.post("/api/recommend", json={"problems": PROBLEMS})
+            location = posted.headers["Content-Location"]
+            etag = posted.headers["ETag"]
+
+            fetched = await client.get(location)
+            revalidated = await client.get(location, headers={"If-None-Match": etag})
+
+        mock_recommend.assert_called_once()
+
+    assert posted.status_code == 200
+    assert fetched.status_code == 200
+    assert fetched.json() == {"recommendations": RECOMMENDATIONS}
+    assert fetched.headers["ETag"] == etag
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+
+
+@pytest.mark.asyncio
+async def test_unknown_result_returns_404():
+    """Test that unknown result ids are not found."""
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get("/api/recommend/unknown")
+
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_result_headers_are_exposed_to_frontend():
+    """Test that CORS lets the frontend read ETag and Content-Location."""
+    with patch("main.get_recommendations", new_callable=AsyncMock) as mock_recommend:
+        mock_recommend.return_value = RECOMMENDATIONS
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            response = await client.post(
+                "/api/recommend",
+                json={"problems": PROBLEMS},
+                headers={"Origin": "http://localhost:3000"},
+            )
+
+    exposed = response.headers["Access-Control-Expose-Headers"].lower()
+    assert "etag" in exposed
+    assert "content-location" in exposed
+
+
+@pytest.mark.asyncio
+async def test_result_cache_failure_still_returns_result():
+    """Test that a failed cache write drops the result headers, not the result."""
+    metrics.reset()
+    failing_put = patch.object(result_cache, "put", side_effect=OSError("disk full"))
+    with patch("main.get_recommendations", new_callable=AsyncMock) as mock_recommend, failing_put:
+        mock_recommend.return_value = RECOMMENDATIONS
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            response = await client.post("/api/recommend", json={"problems": PROBLEMS})
+
+    assert response.status_code == 200
+    assert response.json() == {"recommendations": RECOMMENDATIONS}
+    assert "ETag" not in response.headers
+    assert "Content-Location" not in response.headers
+    assert metrics.counter("http_cache.put_errors") == 1
+    metrics.reset()
@@ -0,0 +1,182 @@
+"""Tests for the profiling module and admin profiling endpoints."""
+
+import asyncio
+import os
+import sys
+import time
+import pytest
+from httpx import ASGITransport, AsyncClient
+from unittest.mock import AsyncMock, patch
+
+from main import app
+from profiling import Profiler, fold_stack, profiler
+
+ADMIN_HEADERS = {"X-Admin-Token": "secret"}
+
+
+@pytest.fixture(autouse=True)
+def admin_token(monkeypatch):
+    """Enable admin endpoints and reset the shared profiler."""
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    profiler.reset()
+    profiler.sample_rate = 0.0
+    interval = profiler.sampler.interval
+    yield
+    profiler.reset()
+    profiler.sample_rate = 0.0
+    profiler.sampler.interval = interval
+
+
+def busy_wait(seconds: float) -> None:
+    """Keep the current thread on-CPU for the given time."""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_fold_stack_orders_root_first():
+    """Test that folded stacks list the outermost frame first."""
+    import sys
+
+    def inner():
+        return fold_stack(sys._getframe())
+
+    stack = inner()
+    assert stack.split(";")[-1].startswith("inner (test_profiling.py:")
+    assert "test_fold_stack_orders_root_first" in stack.split(";")[-2]
+
+
+def test_profile_request_collects_samples():
+    """Test that a profiled block produces collapsed stacks."""
+    local = Profiler(interval=0.001)
+    with local.profile_request() as profile_id:
+        busy_wait(0.05)
+
+    stacks = local.request_stacks(profile_id)
+    assert "busy_wait" in stacks
+    line = stacks.splitlines()[0]
+    assert int(line.rsplit(" ", 1)[1]) > 0
+
+
+def test_should_sample_respects_rate():
+    """Test sampling decisions at the boundary rates."""
+    assert not Profiler(sample_rate=0.0).should_sample()
+    assert Profiler(sample_rate=1.0).should_sample()
+
+
+@pytest.mark.asyncio
+async def test_admin_endpoints_require_token():
+    """Test that profiling endpoints reject missing or wrong tokens."""
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        missing = await client.get("/admin/profiling")
+        wrong = await client.get("/admin/profiling", headers={"X-Admin-Token": "x"})
+        ok = await client.get("/admin/profiling", headers=ADMIN_HEADERS)
+
+    assert missing.status_code == 403
+    assert wrong.status_code == 403
+    assert ok.status_code == 200
+    assert ok.json()["sample_rate"] == 0.0
+    assert ok.json()["pid"] == os.getpid()
+
+
+@pytest.mark.asyncio
+async def test_admin_endpoints_disabled_without_admin_token(monkeypatch):
+    """Test that profiling endpoints are hidden when ADMIN_TOKEN is unset."""
+    monkeypatch.delenv("ADMIN_TOKEN")
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get("/admin/profiling", headers=ADMIN_HEADERS)
+
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_sampled_requests_are_aggregated():
+    """Test that sampled requests produce aggregate stacks."""
+
+    async def slow_analyze(**kwargs):
+        busy_wait(0.05)
+        await asyncio.sleep(0)
+        return [{"id": i, "title": "t", "description": "d"} for i in (1, 2, 3)]
+
+    profiler.sampler.interval = 0.001
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.put(
+            "/admin/profiling", json={"sample_rate": 1.0}, headers=ADMIN_HEADERS
+        )
+        assert response.status_code == 200
+
+        with patch("main.analyze_problems", new=AsyncMock(side_effect=slow_analyze)):
+            await client.post(
+                "/api/analyze",
+                json={"feeling": "a", "troubles": "b", "changes": "c"},
+            )
+
+        stacks = await client.get("/admin/profiling/stacks", headers=ADMIN_HEADERS)
+
+    assert stacks.status_code == 200
+    assert "busy_wait" in stacks.text
+
+
+@pytest.mark.asyncio
+async def test_single_request_profile_via_header():
+    """Test that X-Profile returns a retrievable per-request profile id."""
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get(
+            "/health", headers={"X-Profile": "1", **ADMIN_HEADERS}
+        )
+        profile_id = response.headers["X-Profile-Id"]
+        profile = await client.get(
+            f"/admin/profiling/requests/{profile_id}", headers=ADMIN_HEADERS
+        )
+
+    assert profile.status_code == 200
+    assert profile_id in profiler.request_profile_ids()
+
+
+@pytest.mark.asyncio
+async def test_profile_header_ignored_without_admin_token():
+    """Test that X-Profile without a valid token does not profile."""
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get("/health", headers={"X-Profile": "1"})
+
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+    assert profiler.request_profile_ids() == []
+
+
+def other_request_work(seconds: float) -> None:
+    """Busy work done on behalf of a concurrent request."""
+    busy_wait(seconds)
+
+
+@pytest.mark.asyncio
+async def test_request_profile_excludes_concurrent_work_and_idle_time():
+    """Test that an anchored profile only counts its own coroutine."""
+    local = Profiler(interval=0.001)
+
+    async def profiled() -> str:
+        with local.profile_request(sys._getframe()) as profile_id:
+            busy_wait(0.03)
+            await asyncio.sleep(0.1)
+        return profile_id
+
+    async def concurrent() -> None:
+        await asyncio.sleep(0.01)
+        other_request_work(0.03)
+
+    profile_id, _ = await asyncio.gather(profiled(), concurrent())
+    stacks = local.request_stacks(profile_id)
+
+    assert "busy_wait" in stacks
+    assert "other_request_work" not in stacks
+    assert "selectors.py" not in stacks
@@ -0,0 +1,199 @@
+"""Tests for the recommendation store and its use in get_recommendations."""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import llm
+from metrics import metrics
+from recommendation_store import RecommendationStore, normalize_text, problem_key, stats_id
+
+
+def create_mock_response(recommendations: list) -> MagicMock:
+    """Create a mock Anthropic API response with recommendations."""
+    mock_response = MagicMock()
+    mock_content = MagicMock()
+    mock_content.text = json.dumps({"recommendations": recommendations})
+    mock_response.content = [mock_content]
+    return mock_response
+
+
+PROBLEMS = [
+    {"id": 1, "title": "Pracovní stres", "description": "Příliš mnoho práce"},
+    {"id": 2, "title": "Spánek", "description": "Špatně spím"},
+]
+
+
+def test_normalize_text_collapses_case_and_whitespace():
+    """Test that normalization ignores case, whitespace and trailing punctuation."""
+    assert normalize_text("  Pracovní   STRES. ") == "pracovní stres"
+    assert problem_key({"title": "Spánek", "description": "Špatně spím!"}) == (
+        problem_key({"title": "spánek ", "description": "špatně  spím"})
+    )
+
+
+def test_store_records_hits_and_misses():
+    """Test that lookups are counted per problem."""
+    store = RecommendationStore()
+    assert store.lookup(PROBLEMS[0]) is None
+    store.put(PROBLEMS[0], "Dělej přestávky")
+    assert store.lookup(PROBLEMS[0]) == "Dělej přestávky"
+
+    stats = store.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["top"] == [
+        {"id": stats_id(problem_key(PROBLEMS[0])), "hits": 1, "misses": 1, "hit_rate": 0.5}
+    ]
+
+
+def test_store_stats_do_not_expose_problem_text():
+    """Test that statistics identify problems only by an opaque hash."""
+    store = RecommendationStore()
+    store.lookup(PROBLEMS[0])
+    report = json.dumps(store.stats(), ensure_ascii=False).casefold()
+    assert "pracovní" not in report
+    assert "práce" not in report
+
+
+def test_store_stats_are_bounded():
+    """Test that per-problem statistics are evicted with the same LRU limit."""
+    store = RecommendationStore(max_entries=2)
+    for i in range(10):
+        store.lookup({"title": f"problém {i}", "description": "d"})
+    stats = store.stats()
+    assert len(store._stats) == 2
+    assert stats["misses"] == 10
+
+
+def test_store_evicts_least_recently_used():
+    """Test that the store is bounded."""
+    store = RecommendationStore(max_entries=1)
+    store.put(PROBLEMS[0], "a")
+    store.put(PROBLEMS[1], "b")
+    assert len(store) == 1
+    assert store.lookup(PROBLEMS[0]) is None
+    assert store.lookup(PROBLEMS[1]) == "b"
+
+
+def test_store_reports_stale_entries():
+    """Test that entries older than refresh_after are stale."""
+    now = [0.0]
+    store = RecommendationStore(refresh_after=10, clock=lambda: now[0])
+    store.put(PROBLEMS[0], "a")
+    assert not store.is_stale(PROBLEMS[0])
+    now[0] = 11.0
+    assert store.is_stale(PROBLEMS[0])
+
+
+@pytest.mark.asyncio
+async def test_get_recommendations_only_calls_llm_for_missing_problems():
+    """Test that stored problems are not sent to the API and results are merged."""
+    store = RecommendationStore()
+    store.put(PROBLEMS[0], "Dělej přestávky")
+    mock_response = create_mock_response([{"problem_id": 2, "advice": "Jdi spát dřív"}])
+
+    with patch("llm.recommendation_store", store), patch("llm.client") as mock_client:
+        mock_client.beta.messages.create = AsyncMock(return_value=mock_response)
+
+        result = await llm.get_recommendations(problems=PROBLEMS)
+
+        user_message = mock_client.beta.messages.create.call_args.kwargs["messages"][0]["content"]
+        assert "Spánek" in user_message
+        assert "Pracovní stres" not in user_message
+
+    assert result == [
+        {"problem_id": 1, "advice": "Dělej přestávky"},
+        {"problem_id": 2, "advice": "Jdi spát dřív"},
+    ]
+    assert store.lookup(PROBLEMS[1]) == "Jdi spát dřív"
+
+
+@pytest.mark.asyncio
+async def test_get_recommendations_skips_llm_when_all_stored():
+    """Test that a fully stored request makes no API call."""
+    store = RecommendationStore()
+    for problem in PROBLEMS:
+        store.put(problem, f"advice {problem['id']}")
+
+    with patch("llm.recommendation_store", store), patch("llm.client") as mock_client:
+        mock_client.beta.messages.create = AsyncMock()
+
+        result = await llm.get_recommendations(problems=PROBLEMS)
+
+        mock_client.beta.messages.create.assert_not_called()
+
+    assert [r["advice"] for r in result] == ["advice 1", "advice 2"]
+
+
+@pytest.mark.asyncio
+async def test_get_recommendations_refreshes_stale_entries_in_background():
+    """Test that stale entries are served and then regenerated."""
+    now = [0.0]
+    store = RecommendationStore(refresh_after=10, clock=lambda: now[0])
+    store.put(PROBLEMS[0], "old advice")
+    now[0] = 20.0
+    mock_response = create_mock_response([{"problem_id": 1, "advice": "new advice"}])
+
+    with patch("llm.recommendation_store", store), patch("llm.client") as mock_client:
+        mock_client.beta.messages.create = AsyncMock(return_value=mock_response)
+
+        result = await llm.get_recommendations(problems=PROBLEMS[:1])
+        assert result == [{"problem_id": 1, "advice": "old advice"}]
+
+        await asyncio.gather(*llm._refresh_tasks)
+
+    assert store.lookup(PROBLEMS[0]) == "new advice"
+
+
+@pytest.mark.asyncio
+async def test_batched_advice_is_stored_only_after_single_problem_generation():
+    """Test that advice written next to other problems never reaches the store."""
+    store = RecommendationStore()
+    batch = create_mock_response([
+        {"problem_id": 1, "advice": "batched 1"},
+        {"problem_id": 2, "advice": "batched 2"},
+    ])
+
+    def single(problem_id: int) -> MagicMock:
+        return create_mock_response([{"problem_id": problem_id, "advice": f"alone {problem_id}"}])
+
+    with patch("llm.recommendation_store", store), patch("llm.client") as mock_client:
+        mock_client.beta.messages.create = AsyncMock(side_effect=[batch, single(1), single(2)])
+
+        result = await llm.get_recommendations(problems=PROBLEMS)
+        assert [r["advice"] for r in result] == ["batched 1", "batched 2"]
+        assert len(store) == 0
+
+        await asyncio.gather(*llm._refresh_tasks)
+
+        for call in mock_client.beta.messages.create.call_args_list[1:]:
+            user_message = call.kwargs["messages"][0]["content"]
+            assert ("Spánek" in user_message) != ("Pracovní stres" in user_message)
+
+    assert store.lookup(PROBLEMS[0]) == "alone 1"
+    assert store.lookup(PROBLEMS[1]) == "alone 2"
+
+
+@pytest.mark.asyncio
+async def test_store_failures_fall_back_to_the_llm():
+    """Test that a failing store neither fails the request nor skips the LLM."""
+    store = RecommendationStore()
+    store.lookup_many = MagicMock(side_effect=OSError("database is locked"))
+    store.put_many = MagicMock(side_effect=OSError("database is locked"))
+    mock_response = create_mock_response([{"problem_id": 1, "advice": "Dělej přestávky"}])
+    metrics.reset()
+
+    with patch("llm.recommendation_store", store), patch("llm.client") as mock_client:
+        mock_client.beta.messages.create = AsyncMock(return_value=mock_response)
+
+        result = await llm.get_recommendations(problems=PROBLEMS[:1])
+
+        mock_client.beta.messages.create.assert_called_once()
+
+    assert result == [{"problem_id": 1, "advice": "Dělej přestávky"}]
+    assert metrics.counter("recommendation_store.errors", op="lookup_many") == 1
+    assert metrics.counter("recommendation_store.errors", op="put_many") == 1
+    assert metrics.counter("recommendation_store.misses") == 1
+    metrics.reset()
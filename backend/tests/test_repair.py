@@ -0,0 +1,156 @@
+"""Tests for repair retries of invalid LLM responses."""
+
+import json
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from llm import MAX_REPAIR_ATTEMPTS, analyze_problems, get_recommendations
+from metrics import metrics
+from recommendation_store import RecommendationStore
+
+
+def response(payload: dict, input_tokens: int, output_tokens: int) -> SimpleNamespace:
+    """Create an API response with usage information."""
+    return SimpleNamespace(
+        content=[SimpleNamespace(text=json.dumps(payload))],
+        stop_reason="end_turn",
+        usage=SimpleNamespace(input_tokens=input_tokens, output_tokens=output_tokens),
+    )
+
+
+def problem(i: int) -> dict:
+    """Create a problem with the given id."""
+    return {"id": i, "title": f"Problém {i}", "description": f"Popis {i}"}
+
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    """Start each test with empty metrics and an empty recommendation store."""
+    metrics.reset()
+    with patch("llm.recommendation_store", RecommendationStore()):
+        yield
+    metrics.reset()
+
+
+@pytest.mark.asyncio
+async def test_analyze_asks_only_for_missing_problems():
+    """Test that a short analysis is completed by a small follow-up call."""
+    responses = [
+        response({"problems": [problem(1), problem(2)]}, 500, 200),
+        response({"problems": [problem(7)]}, 700, 80),
+    ]
+    with patch("llm.client") as mock_client:
+        mock_client.beta.messages.create = AsyncMock(side_effect=responses)
+
+        result = await analyze_problems(feeling="a", troubles="b", changes="c")
+
+        repair_kwargs = mock_client.beta.messages.create.call_args_list[1].kwargs
+
+    assert [p["id"] for p in result] == [1, 2, 3]
+    assert result[2]["title"] == "Problém 7"
+    assert [m["role"] for m in repair_kwargs["messages"]] == ["user", "assistant", "user"]
+    assert "POUZE 1" in repair_kwargs["messages"][2]["content"]
+    assert metrics.counter("llm.repair.attempts", endpoint="analyze") == 1
+    assert metrics.counter("llm.repair.tokens_saved", endpoint="analyze") == 200 - 80
+
+
+@pytest.mark.asyncio
+async def test_analyze_keeps_chosen_problems_when_too_many():
+    """Test that extra problems are removed by asking only for ids to keep."""
+    responses = [
+        response({"problems": [problem(i) for i in range(1, 6)]}, 500, 400),
+        response({"keep_ids": [5, 2, 4]}, 900, 10),
+    ]
+    with patch("llm.client") as mock_client:
+        mock_client.beta.messages.create = AsyncMock(side_effect=responses)
+
+        result = await analyze_problems(feeling="a", troubles="b", changes="c")
+
+        repair_kwargs = mock_client.beta.messages.create.call_args_list[1].kwargs
+
+    assert [p["title"] for p in result] == ["Problém 5", "Problém 2", "Problém 4"]
+    assert [p["id"] for p in result] == [1, 2, 3]
+    assert "keep_ids" in repair_kwargs["output_format"]["schema"]["properties"]
+    assert metrics.counter("llm.repair.tokens_saved", endpoint="analyze") == 400 - 10
+
+
+@pytest.mark.asyncio
+async def test_analyze_regenerates_after_failed_repairs():
+    """Test that a full regeneration happens only after repairs are exhausted."""
+    short = response({"problems": [problem(1)]}, 500, 100)
+    empty = response({"problems": []}, 600, 5)
+    full = response({"problems": [problem(i) for i in (1, 2, 3)]}, 500, 300)
+    responses = [short] + [empty] * MAX_REPAIR_ATTEMPTS + [full]
+
+    with patch("llm.client") as mock_client:
+        mock_client.beta.messages.create = AsyncMock(side_effect=responses)
+
+        result = await analyze_problems(feeling="a", troubles="b", changes="c")
+
+        assert mock_client.beta.messages.create.call_count == MAX_REPAIR_ATTEMPTS + 2
+
+    assert len(result) == 3
+    assert metrics.counter("llm.repair.attempts", endpoint="analyze") == MAX_REPAIR_ATTEMPTS
+    assert metrics.counter("llm.repair.regenerations", endpoint="analyze") == 1
+
+
+@pytest.mark.asyncio
+async def test_analyze_raises_when_regeneration_is_still_invalid():
+    """Test that the ValueError is kept when nothing fixes the response."""
+    short = response({"problems": [problem(1)]}, 500, 100)
+    empty = response({"problems": []}, 600, 5)
+    with patch("llm.client") as mock_client:
+        mock_client.beta.messages.create = AsyncMock(
+            side_effect=[short] + [empty] * MAX_REPAIR_ATTEMPTS + [short]
+        )
+
+        with pytest.raises(ValueError, match="Expected exactly 3 problems"):
+            await analyze_problems(feeling="a", troubles="b", changes="c")
+
+
+@pytest.mark.asyncio
+async def test_recommendations_repair_asks_only_for_missing_ids():
+    """Test that missing recommendations are requested by problem id."""
+    problems = [problem(1), problem(2), problem(3)]
+    responses = [
+        response({"recommendations": [
+            {"problem_id": 1, "advice": "a1"},
+            {"problem_id": 9, "advice": "unknown"},
+        ]}, 600, 300),
+        response({"recommendations": [
+            {"problem_id": 2, "advice": "a2"},
+            {"problem_id": 3, "advice": "a3"},
+        ]}, 800, 150),
+    ]
+    with patch("llm.client") as mock_client:
+        mock_client.beta.messages.create = AsyncMock(side_effect=responses)
+
+        result = await get_recommendations(problems=problems)
+
+        repair_kwargs = mock_client.beta.messages.create.call_args_list[1].kwargs
+
+    assert result == [
+        {"problem_id": 1, "advice": "a1"},
+        {"problem_id": 2, "advice": "a2"},
+        {"problem_id": 3, "advice": "a3"},
+    ]
+    assert "id 2, 3" in repair_kwargs["messages"][2]["content"]
+    assert metrics.counter("llm.repair.attempts", endpoint="recommend") == 1
+    assert metrics.counter("llm.repair.tokens_saved", endpoint="recommend") == 300 - 150
+    assert metrics.counter("llm.repair.dropped_items", endpoint="recommend") == 1
+
+
+@pytest.mark.asyncio
+async def test_recommendations_raise_when_problem_stays_unanswered():
+    """Test that get_recommendations fails if a problem never gets advice."""
+    empty = response({"recommendations": []}, 600, 5)
+    with patch("llm.client") as mock_client:
+        mock_client.beta.messages.create = AsyncMock(return_value=empty)
+
+        with pytest.raises(ValueError, match=r"Missing recommendations for problems \[1\]"):
+            await get_recommendations(problems=[problem(1)])
+
+        assert mock_client.beta.messages.create.call_count == MAX_REPAIR_ATTEMPTS + 2
+
+    assert metrics.counter("llm.repair.regenerations", endpoint="recommend") == 1
@@ -0,0 +1,150 @@
+"""Tests for the priority-aware LLM scheduler."""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from llm import analyze_problems
+from metrics import metrics
+from scheduler import BACKGROUND, BATCH, INTERACTIVE, LLMScheduler
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    """Start each test with empty metrics."""
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+async def run_in_order(scheduler: LLMScheduler, priorities: list[str]) -> list[str]:
+    """Queue calls behind a held slot and return the order they were dispatched in."""
+    order: list[str] = []
+    release = asyncio.Event()
+
+    async def holder():
+        async with scheduler.slot(INTERACTIVE):
+            await release.wait()
+
+    async def call(priority: str):
+        async with scheduler.slot(priority):
+            order.append(priority)
+
+    held = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    tasks = []
+    for priority in priorities:
+        tasks.append(asyncio.create_task(call(priority)))
+        await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(held, *tasks)
+    return order
+
+
+@pytest.mark.asyncio
+async def test_unknown_priority_raises():
+    """Test that only configured priority classes are accepted."""
+    scheduler = LLMScheduler()
+    with pytest.raises(ValueError, match="Unknown priority class"):
+        async with scheduler.slot("urgent"):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_interactive_preempts_queued_background_work():
+    """Test that interactive calls jump ahead of queued bulk calls."""
+    scheduler = LLMScheduler(max_concurrency=1, caps={INTERACTIVE: 1, BACKGROUND: 1, BATCH: 1})
+    order = await run_in_order(scheduler, [BACKGROUND, BATCH, BACKGROUND, INTERACTIVE])
+    assert order[0] == INTERACTIVE
+
+
+@pytest.mark.asyncio
+async def test_weighted_fair_queuing_between_bulk_classes():
+    """Test that queued classes are served in proportion to their weights."""
+    scheduler = LLMScheduler(
+        max_concurrency=1,
+        weights={INTERACTIVE: 8, BACKGROUND: 2, BATCH: 1},
+        caps={INTERACTIVE: 1, BACKGROUND: 1, BATCH: 1},
+    )
+    order = await run_in_order(scheduler, [BATCH] * 6 + [BACKGROUND] * 6)
+    first_nine = order[:9]
+    assert first_nine.count(BACKGROUND) == 6
+    assert first_nine.count(BATCH) == 3
+
+
+@pytest.mark.asyncio
+async def test_per_class_concurrency_cap():
+    """Test that a class never exceeds its own cap."""
+    scheduler = LLMScheduler(max_concurrency=4, caps={INTERACTIVE: 4, BACKGROUND: 1, BATCH: 1})
+    peak = 0
+    active = 0
+
+    async def call():
+        nonlocal peak, active
+        async with scheduler.slot(BACKGROUND):
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*(call() for _ in range(5)))
+    assert peak == 1
+    assert scheduler.running == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_slot():
+    """Test that cancelling a queued call keeps the scheduler usable."""
+    scheduler = LLMScheduler(max_concurrency=1)
+    release = asyncio.Event()
+
+    async def holder():
+        async with scheduler.slot(INTERACTIVE):
+            await release.wait()
+
+    async def waiter():
+        async with scheduler.slot(BACKGROUND):
+            pass
+
+    held = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    waiting = asyncio.create_task(waiter())
+    await asyncio.sleep(0)
+    waiting.cancel()
+    release.set()
+    await held
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+
+    assert scheduler.running == 0
+    assert scheduler.queued(BACKGROUND) == 0
+    async with scheduler.slot(BACKGROUND):
+        assert scheduler.running == 1
+
+
+@pytest.mark.asyncio
+async def test_wait_time_is_reported_per_class():
+    """Test that wait times are recorded per priority class."""
+    scheduler = LLMScheduler(max_concurrency=1)
+    await run_in_order(scheduler, [BATCH, INTERACTIVE])
+    summaries = metrics.snapshot()["summaries"]
+    assert summaries["scheduler.wait_seconds{priority=batch}"]["count"] == 1
+    assert summaries["scheduler.wait_seconds{priority=interactive}"]["count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_analyze_problems_uses_requested_priority():
+    """Test that analyze_problems schedules its API call in the given class."""
+    problems = [{"id": i, "title": "t", "description": "d"} for i in (1, 2, 3)]
+    mock_response = MagicMock()
+    mock_content = MagicMock()
+    mock_content.text = json.dumps({"problems": problems})
+    mock_response.content = [mock_content]
+
+    with patch("llm.scheduler", LLMScheduler()), patch("llm.client") as mock_client:
+        mock_client.beta.messages.create = AsyncMock(return_value=mock_response)
+        await analyze_problems(feeling="a", troubles="b", changes="c", priority=BATCH)
+
+    summaries = metrics.snapshot()["summaries"]
+    assert "scheduler.wait_seconds{priority=batch}" in summaries
@@ -0,0 +1,211 @@
+"""Tests for the shared state module."""
+
+import multiprocessing
+import pytest
+from recommendation_store import SharedRecommendationStore, problem_key, stats_id
+from shared_state import SharedStore
+
+PROBLEM = {"id": 1, "title": "Spánek", "description": "Špatně spím"}
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _increment_many(path: str, count: int) -> None:
+    store = SharedStore(path)
+    for _ in range(count):
+        store.incr("counter")
+
+
+def test_set_get_and_delete(tmp_path):
+    """Test that JSON values round-trip and can be deleted."""
+    store = SharedStore(str(tmp_path / "state.db"))
+    store.set("k", {"advice": "Spi víc", "n": [1, 2]})
+    assert store.get("k") == {"advice": "Spi víc", "n": [1, 2]}
+    store.delete("k")
+    assert store.get("k", "missing") == "missing"
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    """Test that expired entries are invisible and purged."""
+    clock = FakeClock()
+    store = SharedStore(str(tmp_path / "state.db"), clock=clock)
+    store.set("short", 1, ttl=10)
+    store.set("forever", 2)
+    clock.now += 11
+    assert store.get("short") is None
+    assert store.get("forever") == 2
+    assert store.purge_expired() == 1
+
+
+def test_add_only_stores_missing_keys(tmp_path):
+    """Test that add succeeds once, and again after expiry."""
+    clock = FakeClock()
+    store = SharedStore(str(tmp_path / "state.db"), clock=clock)
+    assert store.add("lock", True, ttl=5)
+    assert not store.add("lock", True, ttl=5)
+    clock.now += 6
+    assert store.add("lock", True, ttl=5)
+
+
+def test_incr_uses_fixed_window(tmp_path):
+    """Test that counters keep their expiry and restart after it."""
+    clock = FakeClock()
+    store = SharedStore(str(tmp_path / "state.db"), clock=clock)
+    assert store.incr("rate", ttl=60) == 1
+    clock.now += 30
+    assert store.incr("rate", 2, ttl=60) == 3
+    clock.now += 31
+    assert store.incr("rate", ttl=60) == 1
+
+
+def test_items_filters_by_prefix(tmp_path):
+    """Test that prefix listing only returns matching live keys."""
+    store = SharedStore(str(tmp_path / "state.db"))
+    store.set("a:1", 1)
+    store.set("a:2", 2)
+    store.set("b:1", 3)
+    assert store.items("a:") == {"a:1": 1, "a:2": 2}
+    store.delete_prefix("a:")
+    assert store.items("a:") == {}
+
+
+def test_incr_many_updates_counters_in_one_call(tmp_path):
+    """Test that batched increments follow the fixed-window rules of incr."""
+    clock = FakeClock()
+    store = SharedStore(str(tmp_path / "state.db"), clock=clock)
+    store.incr("a", 5, ttl=60)
+    store.incr_many({"a": 2, "b": 3}, ttl=60)
+    assert store.items("") == {"a": 7, "b": 3}
+    clock.now += 61
+    assert store.purge_expired() == 2
+
+
+def test_items_limit_and_count(tmp_path):
+    """Test that prefix scans can be bounded and counted."""
+    store = SharedStore(str(tmp_path / "state.db"))
+    for i in range(5):
+        store.set(f"k:{i}", i)
+    assert store.items("k:", limit=2) == {"k:0": 0, "k:1": 1}
+    assert store.count("k:") == 5
+
+
+def test_incr_is_atomic_across_processes(tmp_path):
+    """Test that concurrent workers do not lose counter updates."""
+    path = str(tmp_path / "state.db")
+    SharedStore(path)
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=_increment_many, args=(path, 50)) for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert SharedStore(path).get("counter") == 200
+
+
+def test_shared_recommendation_store_is_visible_to_other_workers(tmp_path):
+    """Test that advice stored by one worker is a hit for another."""
+    path = str(tmp_path / "state.db")
+    first = SharedRecommendationStore(SharedStore(path))
+    second = SharedRecommendationStore(SharedStore(path))
+
+    assert second.lookup(PROBLEM) is None
+    first.put(PROBLEM, "Jdi spát dřív")
+    assert second.lookup(PROBLEM) == "Jdi spát dřív"
+
+    second.flush_stats()
+    stats = first.stats()
+    assert stats["entries"] == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    (entry,) = stats["top"]
+    assert entry["id"] == stats_id(problem_key(PROBLEM))
+
+    assert first.begin_refresh(PROBLEM)
+    assert not second.begin_refresh(PROBLEM)
+    first.end_refresh(PROBLEM)
+    assert second.begin_refresh(PROBLEM)
+
+
+def test_shared_store_keys_do_not_contain_problem_text(tmp_path):
+    """Test that entries and refresh marks are keyed by digest, not by text."""
+    path = tmp_path / "state.db"
+    store = SharedRecommendationStore(SharedStore(str(path)))
+    store.put(PROBLEM, "Jdi spát dřív")
+    assert store.begin_refresh(PROBLEM)
+    store.lookup(PROBLEM)
+    store.flush_stats()
+
+    keys = store.shared.items("recommendation:")
+    assert f"recommendation:entry:{stats_id(problem_key(PROBLEM))}" in keys
+    assert f"recommendation:refreshing:{stats_id(problem_key(PROBLEM))}" in keys
+    assert store.lookup(PROBLEM) == "Jdi spát dřív"
+    for db_file in tmp_path.iterdir():
+        assert "spánek".encode() not in db_file.read_bytes()
+
+
+def test_shared_lookups_do_not_write(tmp_path):
+    """Test that lookups only count in memory until stats are flushed."""
+    clock = FakeClock()
+    shared = SharedStore(str(tmp_path / "state.db"), clock=clock)
+    store = SharedRecommendationStore(shared, refresh_after=10, clock=clock)
+    store.put(PROBLEM, "Jdi spát dřív")
+
+    assert store.lookup_many([PROBLEM, {"title": "x", "description": "y"}]) == [
+        ("Jdi spát dřív", False),
+        (None, False),
+    ]
+    assert shared.count("recommendation:hits:") == 0
+
+    store.flush_stats()
+    assert store.stats()["hits"] == 1
+    assert store.stats()["misses"] == 1
+
+    # Counters expire with the entries and are purged
+    clock.now += store.expire_after + 1
+    shared.purge_expired()
+    assert shared.items("recommendation:") == {}
+
+
+def test_shared_store_stats_scan_is_bounded(tmp_path):
+    """Test that stats() scans at most max_stats_rows counters of each kind."""
+    shared = SharedStore(str(tmp_path / "state.db"))
+    store = SharedRecommendationStore(shared, max_stats_rows=3)
+    for i in range(10):
+        store.lookup({"title": f"problém {i}", "description": "d"})
+    store.flush_stats()
+
+    stats = store.stats(top=100)
+    assert stats["misses"] == 10
+    assert len(stats["top"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_maintenance_flushes_stats_and_purges(tmp_path, monkeypatch):
+    """Test that the app's maintenance step flushes counters and purges expired rows."""
+    # Imported here so the spawned worker processes above do not load the app
+    import main
+
+    clock = FakeClock()
+    shared = SharedStore(str(tmp_path / "state.db"), clock=clock)
+    store = SharedRecommendationStore(shared, clock=clock)
+    shared.set("result:old", {"payload": {}}, ttl=1)
+    store.lookup(PROBLEM)
+    clock.now += 2
+    monkeypatch.setattr(main, "shared_store", shared)
+    monkeypatch.setattr(main, "recommendation_store", store)
+
+    await main.maintain_shared_state()
+
+    assert store.stats()["misses"] == 1
+    assert shared.purge_expired() == 0
@@ -0,0 +1,128 @@
+"""Tests for the token budget module."""
+
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from llm import analyze_problems
+from metrics import metrics
+from token_budget import (
+    ELISION_MARKER,
+    MAX_OUTPUT_TOKENS,
+    MIN_OUTPUT_TOKENS,
+    compact_fields,
+    compact_text,
+    estimate_tokens,
+    max_output_tokens,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    """Start each test with empty metrics."""
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_estimate_tokens_grows_with_length():
+    """Test that the local estimate is proportional to text length."""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abc") == 1
+    assert estimate_tokens("a" * 300) == 100
+
+
+def test_compact_text_keeps_short_text():
+    """Test that text within budget only has whitespace trimmed."""
+    assert compact_text("  Jsem   unavený.\n\n\n\nA smutný.  ", 100) == (
+        "Jsem unavený.\n\nA smutný."
+    )
+
+
+def test_compact_text_removes_repeated_sentences():
+    """Test that repeated sentences are dropped before truncation."""
+    text = "Nemůžu spát. " * 50 + "Bolí mě hlava."
+    result = compact_text(text, 20)
+    assert result == "Nemůžu spát. Bolí mě hlava."
+
+
+def test_compact_text_keeps_head_and_tail():
+    """Test that unique over-long text keeps its beginning and end."""
+    text = "START " + " ".join(f"slovo{i}" for i in range(1000)) + " KONEC"
+    result = compact_text(text, 50)
+    assert result.startswith("START")
+    assert result.endswith("KONEC")
+    assert ELISION_MARKER in result
+    assert estimate_tokens(result) <= 50
+
+
+def test_compact_text_is_deterministic():
+    """Test that the same input always compacts to the same output."""
+    text = " ".join(f"věta {i}." for i in range(2000))
+    assert compact_text(text, 100) == compact_text(text, 100)
+
+
+def test_compact_fields_records_metrics():
+    """Test that compaction decisions are exposed in metrics."""
+    result = compact_fields({"short": "ok", "long": "x" * 3000}, 100, endpoint="analyze")
+
+    assert result["short"] == "ok"
+    assert estimate_tokens(result["long"]) <= 100
+    assert metrics.counter("token_budget.compacted_fields", endpoint="analyze", field="long") == 1
+    assert metrics.counter("token_budget.compacted_fields", endpoint="analyze", field="short") == 0
+    assert metrics.counter("token_budget.tokens_saved", endpoint="analyze") > 0
+
+
+def test_max_output_tokens_scales_and_is_bounded():
+    """Test that max_tokens grows with item count within the bounds."""
+    assert max_output_tokens(0, 300, endpoint="recommend") == MIN_OUTPUT_TOKENS
+    assert max_output_tokens(3, 300, endpoint="recommend") < max_output_tokens(
+        6, 300, endpoint="recommend"
+    )
+    assert max_output_tokens(1000, 300, endpoint="recommend") == MAX_OUTPUT_TOKENS
+
+
+@pytest.mark.asyncio
+async def test_analyze_problems_compacts_huge_input():
+    """Test that analyze_problems sends compacted input and a sized max_tokens."""
+    problems = [{"id": i, "title": "t", "description": "d"} for i in (1, 2, 3)]
+    mock_response = MagicMock()
+    mock_content = MagicMock()
+    mock_content.text = json.dumps({"problems": problems})
+    mock_response.content = [mock_content]
+
+    with patch("llm.client") as mock_client:
+        mock_client.beta.messages.create = AsyncMock(return_value=mock_response)
+
+        await analyze_problems(
+            feeling="unavený",
+            troubles="Mám moc práce. " * 5000,
+            changes="klid",
+        )
+
+        call_kwargs = mock_client.beta.messages.create.call_args.kwargs
+
+    assert len(call_kwargs["messages"][0]["content"]) < 5000
+    assert call_kwargs["max_tokens"] == max_output_tokens(3, 250, endpoint="analyze")
+
+
+@pytest.mark.asyncio
+async def test_truncated_response_is_retried_with_larger_budget():
+    """Test that a response cut off at max_tokens is retried once."""
+    problems = [{"id": i, "title": "t", "description": "d"} for i in (1, 2, 3)]
+    truncated = MagicMock(stop_reason="max_tokens")
+    truncated.content = [MagicMock(text='{"problems": [{"id": 1, "ti')]
+    complete = MagicMock(stop_reason="end_turn")
+    complete.content = [MagicMock(text=json.dumps({"problems": problems}))]
+
+    with patch("llm.client") as mock_client:
+        mock_client.beta.messages.create = AsyncMock(side_effect=[truncated, complete])
+
+        result = await analyze_problems(feeling="a", troubles="b", changes="c")
+
+        calls = mock_client.beta.messages.create.call_args_list
+
+    assert result == problems
+    assert len(calls) == 2
+    assert calls[1].kwargs["max_tokens"] == MAX_OUTPUT_TOKENS
+    assert metrics.counter("token_budget.truncated", key="problems") == 1
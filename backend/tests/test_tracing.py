@@ -0,0 +1,200 @@
+"""Tests for the tracing module."""
+
+import json
+import pytest
+from types import SimpleNamespace
+from httpx import ASGITransport, AsyncClient
+from unittest.mock import AsyncMock, patch
+
+from main import app
+from recommendation_store import RecommendationStore
+from tracing import (
+    STATUS_ERROR,
+    FileSpanExporter,
+    InMemorySpanExporter,
+    Tracer,
+    parse_traceparent,
+    tracer,
+)
+
+
+@pytest.fixture
+def exporter():
+    """Route the process-wide tracer to an in-memory exporter."""
+    memory = InMemorySpanExporter()
+    original = tracer.exporter
+    tracer.exporter = memory
+    yield memory
+    tracer.exporter = original
+
+
+def test_spans_are_noops_without_exporter():
+    """Test that a tracer without exporter creates non-recording spans."""
+    local = Tracer()
+    with local.span("outer") as span:
+        assert not span.recording
+
+
+def test_child_spans_share_trace_and_link_parent():
+    """Test parent/child relationships of nested spans."""
+    memory = InMemorySpanExporter()
+    local = Tracer(exporter=memory)
+    with local.span("outer") as outer:
+        with local.span("inner", answer=42) as inner:
+            pass
+
+    assert memory.names() == ["inner", "outer"]
+    assert inner.trace_id == outer.trace_id
+    assert inner.parent_id == outer.span_id
+    assert outer.parent_id is None
+    assert inner.attributes == {"answer": 42}
+    assert inner.end_ns >= inner.start_ns
+
+
+def test_exceptions_mark_span_as_error():
+    """Test that a failing block records the error on its span."""
+    memory = InMemorySpanExporter()
+    local = Tracer(exporter=memory)
+    with pytest.raises(ValueError):
+        with local.span("failing"):
+            raise ValueError("boom")
+
+    (span,) = memory.spans
+    assert span.status == STATUS_ERROR
+    assert span.status_message == "boom"
+    assert span.attributes["exception.type"] == "ValueError"
+
+
+def test_unsampled_traces_are_not_exported():
+    """Test that unsampled roots and their children are dropped."""
+    memory = InMemorySpanExporter()
+    local = Tracer(exporter=memory, sample_rate=0.0)
+    with local.span("root"):
+        with local.span("child") as child:
+            assert not child.recording
+    assert memory.spans == []
+
+
+def test_parse_traceparent():
+    """Test W3C traceparent parsing."""
+    header = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+    assert parse_traceparent(header) == (
+        0x0AF7651916CD43DD8448EB211C80319C, 0xB7AD6B7169203331
+    )
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent(None) is None
+
+
+def test_file_exporter_writes_otlp_json(tmp_path):
+    """Test that the file exporter writes OTLP/JSON resourceSpans lines."""
+    path = tmp_path / "traces.jsonl"
+    file_exporter = FileSpanExporter(str(path), flush_interval=0.01)
+    local = Tracer(exporter=file_exporter)
+    with local.span("outer", model="m"):
+        with local.span("inner"):
+            pass
+    file_exporter.flush()
+
+    spans = [
+        span
+        for line in path.read_text().splitlines()
+        for resource in json.loads(line)["resourceSpans"]
+        for scope in resource["scopeSpans"]
+        for span in scope["spans"]
+    ]
+    by_name = {span["name"]: span for span in spans}
+    assert by_name["inner"]["parentSpanId"] == by_name["outer"]["spanId"]
+    assert len(by_name["outer"]["traceId"]) == 32
+    assert by_name["outer"]["attributes"] == [{"key": "model", "value": {"stringValue": "m"}}]
+
+
+@pytest.mark.asyncio
+async def test_analyze_request_produces_stage_spans(exporter):
+    """Test that one request yields server, LLM, queue and parse spans."""
+    problems = [{"id": i, "title": "t", "description": "d"} for i in (1, 2, 3)]
+    response = SimpleNamespace(
+        content=[SimpleNamespace(text=json.dumps({"problems": problems}))],
+        stop_reason="end_turn",
+        usage=SimpleNamespace(input_tokens=321, output_tokens=123),
+    )
+    parent = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+    with patch("llm.client") as mock_client, patch("llm.recommendation_store", RecommendationStore()):
+        mock_client.beta.messages.create = AsyncMock(return_value=response)
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            http_response = await client.post(
+                "/api/analyze",
+                json={"feeling": "a", "troubles": "b", "changes": "c"},
+                headers={"traceparent": parent},
+            )
+
+    assert http_response.status_code == 200
+    assert http_response.headers["traceparent"].startswith(
+        "00-0af7651916cd43dd8448eb211c80319c-"
+    )
+    spans = {span.name: span for span in exporter.spans}
+    assert set(spans) == {
+        "POST /api/analyze",
+        "http.validate",
+        "http.handler",
+        "http.serialize",
+        "llm.analyze_problems",
+        "llm.queue",
+        "llm.messages.create",
+        "llm.parse",
+    }
+    assert {span.trace_id for span in spans.values()} == {0x0AF7651916CD43DD8448EB211C80319C}
+    assert spans["POST /api/analyze"].parent_id == 0xB7AD6B7169203331
+    assert spans["POST /api/analyze"].attributes["http.response.status_code"] == 200
+
+    server_id = spans["POST /api/analyze"].span_id
+    validate = spans["http.validate"]
+    handler = spans["http.handler"]
+    serialize = spans["http.serialize"]
+    assert validate.parent_id == handler.parent_id == serialize.parent_id == server_id
+    assert validate.end_ns <= handler.start_ns
+    assert handler.end_ns <= serialize.start_ns <= serialize.end_ns
+    assert spans["llm.analyze_problems"].parent_id == handler.span_id
+
+    create = spans["llm.messages.create"]
+    assert create.parent_id == spans["llm.analyze_problems"].span_id
+    assert create.attributes["gen_ai.request.model"]
+    assert create.attributes["gen_ai.usage.input_tokens"] == 321
+    assert create.attributes["gen_ai.usage.output_tokens"] == 123
+    assert create.attributes["gen_ai.response.finish_reasons"] == "end_turn"
+    assert spans["llm.parse"].attributes["llm.response.items"] == 3
+
+
+@pytest.mark.asyncio
+async def test_validation_failure_is_recorded(exporter):
+    """Test that a rejected request body yields a failed validation span."""
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.post("/api/analyze", json={"feeling": "a"})
+
+    assert response.status_code == 422
+    spans = {span.name: span for span in exporter.spans}
+    assert spans["http.validate"].status == STATUS_ERROR
+    assert "http.handler" not in spans
+    assert "http.serialize" not in spans
+
+
+@pytest.mark.asyncio
+async def test_recommend_result_cache_write_is_traced(exporter):
+    """Test that storing the recommendation result gets its own span."""
+    recommendations = [{"problem_id": 1, "advice": "a"}]
+    with patch("main.get_recommendations", new=AsyncMock(return_value=recommendations)):
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            response = await client.post(
+                "/api/recommend",
+                json={"problems": [{"id": 1, "title": "t", "description": "d"}]},
+            )
+
+    assert response.status_code == 200
+    spans = {span.name: span for span in exporter.spans}
+    assert spans["http_cache.put"].parent_id == spans["http.handler"].span_id
@@ -0,0 +1,100 @@
+"""Tests for the event loop watchdog."""
+
+import asyncio
+import time
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from main import app, lifespan, watchdog
+from metrics import metrics
+from watchdog import LoopWatchdog
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    """Start each test with empty metrics."""
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def block_the_loop(seconds: float) -> None:
+    """Blocking call used to stall the event loop."""
+    time.sleep(seconds)
+
+
+@pytest.mark.asyncio
+async def test_lag_is_exported_as_metric():
+    """Test that the heartbeat reports event loop lag."""
+    local = LoopWatchdog(interval=0.01, threshold=1.0)
+    local.start()
+    await asyncio.sleep(0.05)
+    await local.stop()
+
+    snapshot = metrics.snapshot()
+    assert "event_loop.lag_seconds" in snapshot["gauges"]
+    assert snapshot["summaries"]["event_loop.lag"]["count"] >= 2
+
+
+@pytest.mark.asyncio
+async def test_blocking_call_stack_is_captured():
+    """Test that a stall beyond the threshold captures the blocking stack."""
+    local = LoopWatchdog(interval=0.01, threshold=0.05)
+    local.start()
+    await asyncio.sleep(0.03)
+    block_the_loop(0.3)
+    await asyncio.sleep(0.03)
+    await local.stop()
+
+    assert len(local.blocked_reports) == 1
+    report = local.blocked_reports[0]
+    assert "block_the_loop" in report["stack"]
+    assert report["blocked_seconds"] >= 0.05
+    assert metrics.counter("event_loop.blocked") == 1
+
+
+@pytest.mark.asyncio
+async def test_sync_io_on_loop_is_flagged(tmp_path):
+    """Test that development mode flags blocking I/O on the loop thread."""
+    local = LoopWatchdog(interval=0.01, threshold=1.0, detect_sync_io=True)
+    local.start()
+    with open(tmp_path / "blocking.txt", "w") as f:
+        f.write("x")
+    await asyncio.to_thread(lambda: open(tmp_path / "threaded.txt", "w").close())
+    await local.stop()
+
+    events = [(r["event"], r["args"]) for r in local.sync_io_reports]
+    assert any(event == "open" and "blocking.txt" in args for event, args in events)
+    assert not any("threaded.txt" in args for _, args in events)
+    assert metrics.counter("event_loop.sync_io", event="open") >= 1
+
+
+@pytest.mark.asyncio
+async def test_sync_io_not_flagged_after_stop(tmp_path):
+    """Test that the installed audit hook is inactive once stopped."""
+    local = LoopWatchdog(interval=0.01, threshold=1.0, detect_sync_io=True)
+    local.start()
+    await local.stop()
+    open(tmp_path / "after.txt", "w").close()
+    assert not any("after.txt" in r["args"] for r in local.sync_io_reports)
+
+
+@pytest.mark.asyncio
+async def test_lifespan_starts_and_stops_watchdog():
+    """Test that the app lifespan runs the watchdog."""
+    async with lifespan(app):
+        assert watchdog.running
+    assert not watchdog.running
+
+
+@pytest.mark.asyncio
+async def test_watchdog_report_endpoint(monkeypatch):
+    """Test that the admin endpoint returns watchdog reports."""
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get("/admin/watchdog", headers={"X-Admin-Token": "secret"})
+
+    assert response.status_code == 200
+    assert response.json()["threshold"] == watchdog.threshold
@@ -0,0 +1,125 @@
+"""Token budget module for Life Coach App.
+
+This module estimates prompt sizes locally, compacts over-budget user input
+before it is sent to Claude AI and sizes `max_tokens` from the output each
+endpoint is expected to produce. Every decision is recorded in `metrics`.
+"""
+
+import math
+import os
+import re
+
+from metrics import metrics
+
+# Rough characters per token for Czech text; diacritics make it denser than English
+CHARS_PER_TOKEN = 3.0
+
+# Per-field input budget for /api/analyze fields (feeling, troubles, changes)
+ANALYZE_FIELD_TOKEN_BUDGET = int(os.getenv("ANALYZE_FIELD_TOKEN_BUDGET", "1000"))
+
+# Per-field input budget for problem titles and descriptions sent for recommendations
+PROBLEM_FIELD_TOKEN_BUDGET = int(os.getenv("PROBLEM_FIELD_TOKEN_BUDGET", "200"))
+
+# Output sizing: JSON overhead per item and for the wrapping object, and safety margin
+JSON_ITEM_OVERHEAD_TOKENS = 20
+JSON_BASE_OVERHEAD_TOKENS = 10
+OUTPUT_TOKEN_MARGIN = 2.0
+MIN_OUTPUT_TOKENS = 256
+MAX_OUTPUT_TOKENS = 4096
+
+# Marker inserted where the middle of an over-long text was dropped
+ELISION_MARKER = " […] "
+
+_INLINE_WHITESPACE_RE = re.compile(r"[ \t\f\v]+")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n\s*")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a text without calling the API."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _normalize_whitespace(text: str) -> str:
+    text = _INLINE_WHITESPACE_RE.sub(" ", text)
+    text = _BLANK_LINES_RE.sub("\n\n", text)
+    return "\n".join(line.strip() for line in text.split("\n")).strip()
+
+
+def _dedupe_sentences(text: str) -> str:
+    seen: set[str] = set()
+    kept = []
+    for sentence in _SENTENCE_END_RE.split(text):
+        key = sentence.strip().casefold()
+        if key and key in seen:
+            continue
+        seen.add(key)
+        kept.append(sentence)
+    return " ".join(kept)
+
+
+def _keep_head_and_tail(text: str, max_chars: int) -> str:
+    available = max(max_chars - len(ELISION_MARKER), 0)
+    head = available * 2 // 3
+    tail = available - head
+    return text[:head].rstrip() + ELISION_MARKER + (text[-tail:].lstrip() if tail else "")
+
+
+def compact_text(text: str, max_tokens: int) -> str:
+    """Deterministically shrink a text to fit into `max_tokens`.
+
+    Steps are applied in order until the text fits: whitespace trimming,
+    removal of repeated sentences, and finally keeping only the head and
+    tail of the text.
+    """
+    text = _normalize_whitespace(text)
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    text = _dedupe_sentences(text)
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    return _keep_head_and_tail(text, int(max_tokens * CHARS_PER_TOKEN))
+
+
+def compact_fields(
+    fields: dict[str, str], max_tokens: int, endpoint: str
+) -> dict[str, str]:
+    """Compact each over-budget field and record the decisions in metrics.
+
+    Args:
+        fields: Mapping of field name to user text.
+        max_tokens: Token budget for each field.
+        endpoint: Endpoint name used as a metrics label.
+
+    Returns:
+        A new mapping with the same keys and compacted values.
+    """
+    compacted = {}
+    total = 0
+    for name, text in fields.items():
+        before = estimate_tokens(text)
+        if before > max_tokens:
+            text = compact_text(text, max_tokens)
+            after = estimate_tokens(text)
+            metrics.increment("token_budget.compacted_fields", endpoint=endpoint, field=name)
+            metrics.increment("token_budget.tokens_saved", before - after, endpoint=endpoint)
+        compacted[name] = text
+        total += estimate_tokens(text)
+    metrics.observe("token_budget.input_tokens", total, endpoint=endpoint)
+    return compacted
+
+
+def max_output_tokens(item_count: int, chars_per_item: int, endpoint: str) -> int:
+    """Size `max_tokens` for a structured response with `item_count` items.
+
+    Args:
+        item_count: Number of items the response is expected to contain.
+        chars_per_item: Maximum text length requested per item in the prompt.
+        endpoint: Endpoint name used as a metrics label.
+    """
+    per_item = math.ceil(chars_per_item / CHARS_PER_TOKEN) + JSON_ITEM_OVERHEAD_TOKENS
+    expected = JSON_BASE_OVERHEAD_TOKENS + per_item * item_count
+    budget = math.ceil(expected * OUTPUT_TOKEN_MARGIN)
+    budget = min(MAX_OUTPUT_TOKENS, max(MIN_OUTPUT_TOKENS, budget))
+    metrics.observe("token_budget.max_tokens", budget, endpoint=endpoint)
+    return budget
@@ -0,0 +1,451 @@
+"""Tracing module for Life Coach App.
+
+This module provides lightweight OpenTelemetry-style spans for the FastAPI
+handlers and LLM calls, and exporters that need no collector: a file
+exporter writing OTLP/JSON lines and an in-memory exporter for tests.
+
+Set `TRACE_EXPORTER=file` and `TRACE_FILE` to export spans; when no
+exporter is configured, spans are no-ops.
+"""
+
+import asyncio
+import functools
+import json
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Iterator, TypeVar
+
+from fastapi.routing import APIRoute
+
+T = TypeVar("T")
+
+SERVICE_NAME = "life-coach-backend"
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+# OTLP status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class Span:
+    """A timed operation with attributes, part of a trace."""
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "kind",
+        "start_ns", "end_ns", "attributes", "status", "status_message", "_tracer",
+    )
+
+    recording = True
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        trace_id: int,
+        parent_id: int | None,
+        kind: int,
+        attributes: dict[str, Any],
+    ) -> None:
+        self._tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = random.getrandbits(64)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = attributes
+        self.status = 0
+        self.status_message = ""
+        self.start_ns = time.time_ns()
+        self.end_ns: int | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Set one attribute; None values are ignored."""
+        if value is not None:
+            self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException) -> None:
+        """Mark the span as failed by `exc`."""
+        self.status = STATUS_ERROR
+        self.status_message = str(exc)
+        self.attributes["exception.type"] = type(exc).__name__
+
+    def end(self, end_ns: int | None = None) -> None:
+        """End the span and hand it to the exporter; later calls are ignored.
+
+        Args:
+            end_ns: End time in nanoseconds since the epoch; defaults to now.
+        """
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns() if end_ns is None else end_ns
+        exporter = self._tracer.exporter
+        if exporter is not None:
+            exporter.export(self)
+
+    @property
+    def traceparent(self) -> str:
+        """W3C `traceparent` header value for this span."""
+        return f"00-{self.trace_id:032x}-{self.span_id:016x}-01"
+
+    def to_otlp(self) -> dict[str, Any]:
+        """Return the span in OTLP/JSON form."""
+        span = {
+            "traceId": f"{self.trace_id:032x}",
+            "spanId": f"{self.span_id:016x}",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": self.status},
+        }
+        if self.parent_id is not None:
+            span["parentSpanId"] = f"{self.parent_id:016x}"
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+class _NonRecordingSpan:
+    """Span stand-in used when tracing is off or the trace is not sampled."""
+
+    recording = False
+    traceparent = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+    def end(self, end_ns: int | None = None) -> None:
+        pass
+
+
+NON_RECORDING_SPAN = _NonRecordingSpan()
+
+_current_span: ContextVar[Any] = ContextVar("current_span", default=None)
+
+# Times at which the endpoint of the current route started and returned
+_route_marks: ContextVar[dict[str, int] | None] = ContextVar("route_marks", default=None)
+
+
+def _otlp_attribute(key: str, value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def parse_traceparent(header: str | None) -> tuple[int, int] | None:
+    """Parse a W3C `traceparent` header into (trace_id, parent_span_id)."""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        return int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+
+
+class Tracer:
+    """Creates spans and sends finished ones to an exporter.
+
+    Args:
+        exporter: Receives finished spans; None turns tracing off.
+        sample_rate: Fraction of new traces to record; child spans follow
+            their parent's decision.
+    """
+
+    def __init__(self, exporter: Any = None, sample_rate: float = 1.0) -> None:
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    def start_span(
+        self,
+        name: str,
+        kind: int = SPAN_KIND_INTERNAL,
+        remote_parent: tuple[int, int] | None = None,
+        **attributes: Any,
+    ) -> Any:
+        """Start a span that is ended manually and does not become current."""
+        if self.exporter is None:
+            return NON_RECORDING_SPAN
+        parent = _current_span.get()
+        if parent is not None:
+            if not parent.recording:
+                return NON_RECORDING_SPAN
+            return Span(self, name, parent.trace_id, parent.span_id, kind, attributes)
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return NON_RECORDING_SPAN
+        if remote_parent is not None:
+            trace_id, parent_id = remote_parent
+        else:
+            trace_id, parent_id = random.getrandbits(128), None
+        return Span(self, name, trace_id, parent_id, kind, attributes)
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        kind: int = SPAN_KIND_INTERNAL,
+        remote_parent: tuple[int, int] | None = None,
+        **attributes: Any,
+    ) -> Iterator[Any]:
+        """Run the enclosed block in a new current span."""
+        span = self.start_span(name, kind, remote_parent, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.record_exception(exc)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+
+def current_span() -> Any:
+    """Return the current span, or a non-recording span."""
+    span = _current_span.get()
+    return NON_RECORDING_SPAN if span is None else span
+
+
+def traced(name: str) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Decorate a coroutine function to run in a span of the process-wide tracer."""
+
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            with tracer.span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class InMemorySpanExporter:
+    """Collects finished spans in a list, for tests."""
+
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def names(self) -> list[str]:
+        """Return the names of the exported spans in end order."""
+        return [span.name for span in self.spans]
+
+    def flush(self) -> None:
+        pass
+
+
+class FileSpanExporter:
+    """Writes spans as OTLP/JSON lines (one `resourceSpans` batch per line).
+
+    Spans are queued and written by a background thread, so exporting never
+    does file I/O on the event loop. The files can be loaded by any tool
+    reading the OTLP JSON file format, such as the collector `otlpjsonfile`
+    receiver.
+    """
+
+    def __init__(self, path: str, batch_size: int = 64, flush_interval: float = 1.0) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._flushed = threading.Condition()
+        self._pending = 0
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        with self._flushed:
+            self._pending += 1
+        self._queue.put(span)
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Block until all exported spans are written."""
+        with self._flushed:
+            self._flushed.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+            with self._flushed:
+                self._pending -= len(batch)
+                self._flushed.notify_all()
+
+    def _write(self, batch: list[Span]) -> None:
+        line = json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [span.to_otlp() for span in batch],
+                }],
+            }]
+        }, ensure_ascii=False, separators=(",", ":"))
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a server span for each HTTP request.
+
+    Continues traces from an incoming `traceparent` header and returns the
+    server span's `traceparent` in the response headers.
+    """
+
+    def __init__(self, app: Any, tracer: Tracer) -> None:
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or self.tracer.exporter is None:
+            await self.app(scope, receive, send)
+            return
+
+        remote_parent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                remote_parent = parse_traceparent(value.decode("latin-1"))
+                break
+
+        with self.tracer.span(
+            f"{scope['method']} {scope['path']}",
+            kind=SPAN_KIND_SERVER,
+            remote_parent=remote_parent,
+            **{"http.request.method": scope["method"], "url.path": scope["path"]},
+        ) as span:
+
+            async def send_with_trace(message: dict) -> None:
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500 and span.recording:
+                        span.status = STATUS_ERROR
+                    if span.traceparent:
+                        message["headers"] = [
+                            *message.get("headers", []),
+                            (b"traceparent", span.traceparent.encode()),
+                        ]
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace)
+
+
+class TracedRoute(APIRoute):
+    """FastAPI route recording request validation, handler and serialization spans.
+
+    FastAPI parses and validates the request, calls the endpoint, then
+    validates and serializes the response in one handler. The endpoint is
+    wrapped to mark when it starts and returns, and the time before and
+    after it is exported as `http.validate` and `http.serialize` spans.
+    Set it as `app.router.route_class` before declaring routes.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        if asyncio.iscoroutinefunction(endpoint):
+            endpoint = _mark_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable[[Any], Awaitable[Any]]:
+        handler = super().get_route_handler()
+
+        async def traced_handler(request: Any) -> Any:
+            if tracer.exporter is None:
+                return await handler(request)
+            marks: dict[str, int] = {}
+            token = _route_marks.set(marks)
+            start_ns = time.time_ns()
+            error = None
+            try:
+                return await handler(request)
+            except BaseException as exc:
+                error = exc
+                raise
+            finally:
+                _route_marks.reset(token)
+                end_ns = time.time_ns()
+                if "started" in marks:
+                    _record_span("http.validate", start_ns, marks["started"])
+                else:
+                    # Validation failed, the endpoint never ran
+                    _record_span("http.validate", start_ns, end_ns, error)
+                if "returned" in marks:
+                    _record_span("http.serialize", marks["returned"], end_ns, error)
+
+        return traced_handler
+
+
+def _mark_endpoint(endpoint: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    @functools.wraps(endpoint)
+    async def marked(*args: Any, **kwargs: Any) -> Any:
+        marks = _route_marks.get()
+        if marks is not None:
+            marks["started"] = time.time_ns()
+        with tracer.span("http.handler"):
+            result = await endpoint(*args, **kwargs)
+        if marks is not None:
+            marks["returned"] = time.time_ns()
+        return result
+
+    return marked
+
+
+def _record_span(
+    name: str, start_ns: int, end_ns: int, error: BaseException | None = None
+) -> None:
+    """Export a child span of the current span covering `start_ns`..`end_ns`."""
+    span = tracer.start_span(name)
+    if not span.recording:
+        return
+    span.start_ns = start_ns
+    if error is not None:
+        span.record_exception(error)
+    span.end(end_ns)
+
+
+def exporter_from_env() -> Any:
+    """Create the span exporter selected by `TRACE_EXPORTER`, if any."""
+    kind = os.getenv("TRACE_EXPORTER", "none")
+    if kind == "none":
+        return None
+    if kind == "file":
+        return FileSpanExporter(os.getenv("TRACE_FILE", "traces.jsonl"))
+    raise ValueError(f"Unknown TRACE_EXPORTER: {kind}")
+
+
+# Process-wide tracer, configured from the environment
+tracer = Tracer(
+    exporter=exporter_from_env(),
+    sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "1.0")),
+)
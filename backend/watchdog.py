@@ -0,0 +1,168 @@
+"""Event loop watchdog module for Life Coach App.
+
+This module measures event loop lag continuously and reports it in
+`metrics`. When the loop stops responding for longer than a threshold, a
+monitor thread captures the stack of the code blocking it. In development
+mode it also flags synchronous I/O performed on the event loop thread.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Audit events treated as blocking I/O when they happen on the loop thread
+BLOCKING_AUDIT_EVENTS = frozenset({
+    "open",
+    "os.system",
+    "socket.connect",
+    "socket.getaddrinfo",
+    "sqlite3.connect",
+    "subprocess.Popen",
+    "time.sleep",
+})
+
+
+def _format_stack(frame: Any, limit: int = 30) -> str:
+    return "".join(traceback.format_stack(frame, limit=limit))
+
+
+class LoopWatchdog:
+    """Watches one event loop for lag and blocking calls.
+
+    Args:
+        interval: Seconds between heartbeats on the event loop.
+        threshold: Extra delay after which the loop counts as blocked.
+        detect_sync_io: Flag blocking I/O audit events on the loop thread.
+        max_reports: Number of recent reports kept for inspection.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        threshold: float = 0.25,
+        detect_sync_io: bool = False,
+        max_reports: int = 50,
+    ) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.detect_sync_io = detect_sync_io
+        self.blocked_reports: deque[dict[str, Any]] = deque(maxlen=max_reports)
+        self.sync_io_reports: deque[dict[str, Any]] = deque(maxlen=max_reports)
+        self._loop_thread_id: int | None = None
+        self._last_beat = time.monotonic()
+        self._heartbeat_task: asyncio.Task | None = None
+        self._monitor: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._audit_hook_installed = False
+        self._in_hook = threading.local()
+
+    @property
+    def running(self) -> bool:
+        """Whether the watchdog is currently started."""
+        return self._heartbeat_task is not None
+
+    def start(self) -> None:
+        """Start watching the running event loop; must be called on the loop."""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._heartbeat_task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._monitor = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._monitor.start()
+        if self.detect_sync_io and not self._audit_hook_installed:
+            # Audit hooks cannot be removed, so the hook checks `running` itself
+            sys.addaudithook(self._audit)
+            self._audit_hook_installed = True
+
+    async def stop(self) -> None:
+        """Stop the heartbeat and monitor thread."""
+        if self._heartbeat_task is None:
+            return
+        self._heartbeat_task.cancel()
+        try:
+            await self._heartbeat_task
+        except asyncio.CancelledError:
+            pass
+        self._heartbeat_task = None
+        self._stop.set()
+        if self._monitor is not None:
+            # Joining can take up to half an interval; do not block the loop on it
+            await asyncio.to_thread(self._monitor.join)
+            self._monitor = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(now - start - self.interval, 0.0)
+            self._last_beat = now
+            metrics.set_gauge("event_loop.lag_seconds", lag)
+            metrics.observe("event_loop.lag", lag)
+
+    def _watch(self) -> None:
+        stalled = False
+        while not self._stop.wait(self.interval / 2):
+            silence = time.monotonic() - self._last_beat
+            if silence < self.interval + self.threshold:
+                stalled = False
+                continue
+            if stalled:
+                continue
+            stalled = True
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = _format_stack(frame) if frame is not None else ""
+            self.blocked_reports.append({
+                "time": time.time(),
+                "blocked_seconds": round(silence, 3),
+                "stack": stack,
+            })
+            metrics.increment("event_loop.blocked")
+            logger.warning(
+                f"Event loop blocked for {silence:.3f}s, stack of blocking code:\n{stack}"
+            )
+
+    def _audit(self, event: str, args: tuple) -> None:
+        if event not in BLOCKING_AUDIT_EVENTS:
+            return
+        if not self.running or threading.get_ident() != self._loop_thread_id:
+            return
+        if getattr(self._in_hook, "active", False):
+            return
+        self._in_hook.active = True
+        try:
+            stack = _format_stack(sys._getframe(1))
+            self.sync_io_reports.append({
+                "time": time.time(),
+                "event": event,
+                "args": repr(args)[:200],
+                "stack": stack,
+            })
+            metrics.increment("event_loop.sync_io", event=event)
+            logger.warning(f"Synchronous I/O on event loop: {event} {repr(args)[:200]}")
+        finally:
+            self._in_hook.active = False
+
+    def report(self) -> dict[str, Any]:
+        """Return the configuration and recent reports."""
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "threshold": self.threshold,
+            "detect_sync_io": self.detect_sync_io,
+            "blocked": list(self.blocked_reports),
+            "sync_io": list(self.sync_io_reports),
+        }
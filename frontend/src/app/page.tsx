@@ -1,6 +1,6 @@
 "use client";
 
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import { QuestionForm } from "@/components/QuestionForm";
 import ProblemsList from "@/components/ProblemsList";
 import Recommendations from "@/components/Recommendations";
@@ -26,6 +26,14 @@ interface FormData {
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
 
+// Session storage key of the last recommendation result, so a reload can refetch it
+const RESULT_STORAGE_KEY = "lifeCoachResult";
+
+interface StoredResult {
+  location: string;
+  problems: Problem[];
+}
+
 export default function Home() {
   const [step, setStep] = useState<Step>("form");
   const [isLoading, setIsLoading] = useState(false);
@@ -33,6 +41,27 @@ export default function Home() {
   const [problems, setProblems] = useState<Problem[]>([]);
   const [recommendations, setRecommendations] = useState<Recommendation[]>([]);
 
+  // Restore the last result after a reload; the browser revalidates it by ETag
+  useEffect(() => {
+    const stored = sessionStorage.getItem(RESULT_STORAGE_KEY);
+    if (!stored) {
+      return;
+    }
+    const { location, problems: storedProblems }: StoredResult = JSON.parse(stored);
+    fetch(`${API_URL}${location}`)
+      .then(async (response) => {
+        if (!response.ok) {
+          sessionStorage.removeItem(RESULT_STORAGE_KEY);
+          return;
+        }
+        const result = await response.json();
+        setProblems(storedProblems);
+        setRecommendations(result.recommendations);
+        setStep("recommendations");
+      })
+      .catch(() => sessionStorage.removeItem(RESULT_STORAGE_KEY));
+  }, []);
+
   const handleFormSubmit = async (data: FormData) => {
     setIsLoading(true);
     setError(null);
@@ -76,6 +105,11 @@ export default function Home() {
       }
 
       const result = await response.json();
+      const location = response.headers.get("Content-Location");
+      if (location) {
+        const stored: StoredResult = { location, problems };
+        sessionStorage.setItem(RESULT_STORAGE_KEY, JSON.stringify(stored));
+      }
       setRecommendations(result.recommendations);
       setStep("recommendations");
     } catch (err) {
@@ -86,6 +120,7 @@ export default function Home() {
   };
 
   const handleReset = () => {
+    sessionStorage.removeItem(RESULT_STORAGE_KEY);
     setStep("form");
     setProblems([]);
     setRecommendations([]);